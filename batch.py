@@ -0,0 +1,288 @@
+"""Offline batch grading.
+
+Evaluates a whole cohort without going through the Streamlit UI:
+
+    python batch.py submissions/ --question question.pdf
+    python batch.py manifest.csv
+    python batch.py manifest.jsonl --workers 8
+
+A folder input holds one sub-folder per student; the `.ipynb`/`.py`/`.pdf`
+file in it is the final output and every other file is a supporting document.
+A CSV/JSONL manifest has the columns `student`, `question`, `supporting_docs`
+(paths separated by `;`) and `final_output`. `question` may be a file path or
+the question text itself.
+
+Completed submissions are recorded in a progress file keyed by the evaluation
+cache key, so re-running an interrupted batch skips work already written to
+the database.
+"""
+import os
+import io
+import re
+import csv
+import json
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils import (
+    CACHE_DIR,
+    evaluation_cache,
+    extract_text_from_file,
+    get_cache_key,
+    get_evaluation_result,
+    migrate_legacy_evaluations,
+    render_pdf_reports
+)
+from db_utils import init_db, add_submissions
+from eval_engine import EvaluationEngine
+from metrics import registry as metrics_registry
+
+FINAL_OUTPUT_EXTENSIONS = ('.ipynb', '.py', '.pdf')
+DEFAULT_PROGRESS_PATH = os.path.join(CACHE_DIR, "batch_progress.jsonl")
+EVALUATION_TIMEOUT = 120
+
+
+def load_local_file(path):
+    """Open a file from disk as an in-memory upload with a `.name`, like Streamlit's UploadedFile."""
+    with open(path, 'rb') as f:
+        upload = io.BytesIO(f.read())
+    upload.name = os.path.basename(path)
+    return upload
+
+
+def read_question(question):
+    if question and os.path.isfile(question):
+        return extract_text_from_file(load_local_file(question))
+    return question or ""
+
+
+def jobs_from_folder(folder, question):
+    jobs = []
+    for student in sorted(os.listdir(folder)):
+        student_dir = os.path.join(folder, student)
+        if not os.path.isdir(student_dir):
+            continue
+        final_output = None
+        supporting_docs = []
+        for name in sorted(os.listdir(student_dir)):
+            path = os.path.join(student_dir, name)
+            if final_output is None and name.lower().endswith(FINAL_OUTPUT_EXTENSIONS):
+                final_output = path
+            else:
+                supporting_docs.append(path)
+        if final_output:
+            jobs.append({
+                "student": student,
+                "question": question,
+                "supporting_docs": supporting_docs,
+                "final_output": final_output
+            })
+    return jobs
+
+
+def jobs_from_manifest(manifest, question):
+    base_dir = os.path.dirname(os.path.abspath(manifest))
+    if manifest.lower().endswith('.jsonl'):
+        with open(manifest, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(manifest, 'r', newline='', encoding='utf-8') as f:
+            records = list(csv.DictReader(f))
+    jobs = []
+    for record in records:
+        supporting_docs = record.get("supporting_docs") or []
+        if isinstance(supporting_docs, str):
+            supporting_docs = [p.strip() for p in supporting_docs.split(';') if p.strip()]
+        record_question = record.get("question")
+        if record_question and os.path.isfile(os.path.join(base_dir, record_question)):
+            # A question path is relative to the manifest, like the other paths; anything else is question text
+            record_question = os.path.join(base_dir, record_question)
+        jobs.append({
+            "student": record["student"],
+            "question": record_question or question,
+            "supporting_docs": [os.path.join(base_dir, p) for p in supporting_docs],
+            "final_output": os.path.join(base_dir, record["final_output"])
+        })
+    return jobs
+
+
+def load_progress(path):
+    done = set()
+    if os.path.isfile(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    done.add((record["student"], record["key"]))
+    return done
+
+
+def prepare_job(job, question_texts):
+    question_text = question_texts[job["question"]]
+    supporting_docs_text = ""
+    for path in job["supporting_docs"]:
+        supporting_docs_text += extract_text_from_file(load_local_file(path)) + "\n\n"
+    final_output_text = extract_text_from_file(load_local_file(job["final_output"]))
+    return question_text, supporting_docs_text, final_output_text
+
+
+def grade_job(job, question_texts, done, engine):
+    """Extract one job on a worker thread and grade it through the evaluation engine.
+
+    The engine retries rate-limited and timed-out model calls with backoff.
+    Returns (cache key, row, feedback), with row and feedback None when the
+    submission was already graded by an earlier run.
+    """
+    student = job["student"]
+    question_text, supporting_docs_text, final_output_text = prepare_job(job, question_texts)
+    key = get_cache_key(question_text, supporting_docs_text, final_output_text)
+    if (student, key) in done:
+        return key, None, None
+    _, feedback = engine.submit(question_text, supporting_docs_text, final_output_text, student_name=student).result()
+    score = feedback.score
+    row = (
+        datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        student,
+        '',  # Institution removed
+        question_text[:200] + "...",
+        score,
+        get_evaluation_result(score)
+    )
+    return key, row, feedback
+
+
+def flush(rows, keys, progress_path):
+    """Write graded rows to the database, then mark them done in the progress file."""
+    if not rows:
+        return
+    add_submissions(rows)
+    with open(progress_path, 'a', encoding='utf-8') as f:
+        for student, key in keys:
+            f.write(json.dumps({"student": student, "key": key}) + "\n")
+    rows.clear()
+    keys.clear()
+
+
+def report_filename(student, key):
+    """`<student>_<key prefix>.pdf`, with the student name reduced to characters safe in a file name."""
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', student).strip('_') or "student"
+    return f"{slug}_{key[:12]}.pdf"
+
+
+def write_reports(reports, reports_dir, workers=None):
+    """Render PDF reports for (student, cache key, row, feedback) results in a process pool.
+
+    Files are named by report_filename, so several submissions from one student do not collide.
+    """
+    if not reports:
+        return
+    os.makedirs(reports_dir, exist_ok=True)
+    pdfs = render_pdf_reports(
+        [(row[1], row[2], row[3], feedback, row[4]) for _, _, row, feedback in reports],
+        workers=workers
+    )
+    for (student, key, _, _), pdf_bytes in zip(reports, pdfs):
+        with open(os.path.join(reports_dir, report_filename(student, key)), 'wb') as f:
+            f.write(pdf_bytes)
+    reports.clear()
+
+
+def run_batch(jobs, workers=4, chunk_size=50, progress_path=DEFAULT_PROGRESS_PATH, reports_dir=None,
+              engine=None):
+    """Extract and grade jobs in parallel and bulk-insert the results. Returns a summary dict.
+
+    With reports_dir set, a PDF report is also rendered for every newly graded
+    submission, one chunk at a time as rows are flushed. Gradings run on
+    `engine`, or on an EvaluationEngine with `workers` workers created for the run.
+    """
+    started = time.time()
+    init_db()
+    done = load_progress(progress_path)
+    question_texts = {q: read_question(q) for q in {job["question"] for job in jobs}}
+    hits_before = evaluation_cache.hits
+
+    summary = {"total": len(jobs), "graded": 0, "skipped": 0, "failed": 0}
+    pending_rows = []
+    pending_keys = []
+    reports = []
+    own_engine = engine is None
+    if own_engine:
+        engine = EvaluationEngine(max_workers=workers, timeout=EVALUATION_TIMEOUT)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(grade_job, job, question_texts, done, engine): job["student"] for job in jobs}
+            for future in as_completed(futures):
+                student = futures[future]
+                try:
+                    key, row, feedback = future.result()
+                except Exception as e:
+                    # A missing or unreadable file fails this submission only
+                    print(f"Failed to grade {student}: {e}")
+                    summary["failed"] += 1
+                    continue
+                if row is None:
+                    summary["skipped"] += 1
+                    continue
+                pending_rows.append(row)
+                pending_keys.append((student, key))
+                if reports_dir:
+                    reports.append((student, key, row, feedback))
+                summary["graded"] += 1
+                if len(pending_rows) >= chunk_size:
+                    # Reports first, so a submission marked done always has its report
+                    if reports_dir:
+                        write_reports(reports, reports_dir)
+                    flush(pending_rows, pending_keys, progress_path)
+        if reports_dir:
+            write_reports(reports, reports_dir)
+        flush(pending_rows, pending_keys, progress_path)
+    finally:
+        if own_engine:
+            engine.shutdown()
+
+    elapsed = time.time() - started
+    summary["cache_hits"] = evaluation_cache.hits - hits_before
+    summary["elapsed_seconds"] = round(elapsed, 2)
+    summary["submissions_per_second"] = round(summary["graded"] / elapsed, 2) if elapsed else 0.0
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade a folder or manifest of submissions offline.")
+    parser.add_argument("source", help="Folder of per-student sub-folders, or a .csv/.jsonl manifest")
+    parser.add_argument("--question", help="Question file or text shared by all submissions")
+    parser.add_argument("--workers", type=int, default=4, help="Number of evaluations in flight")
+    parser.add_argument("--chunk-size", type=int, default=50, help="Rows per database transaction")
+    parser.add_argument("--progress", default=DEFAULT_PROGRESS_PATH, help="Resume file of completed submissions")
+    parser.add_argument("--reports-dir", help="Also write a PDF report per graded submission into this folder")
+    parser.add_argument("--backend", choices=["openai", "http", "stub"], help="Model backend (overrides LLM_BACKEND)")
+    args = parser.parse_args(argv)
+
+    if args.backend:
+        # The backend is created on first use, so the setting takes effect for this run
+        os.environ["LLM_BACKEND"] = args.backend
+
+    metrics_registry.process = "batch"
+    migrate_legacy_evaluations()
+    if os.path.isdir(args.source):
+        jobs = jobs_from_folder(args.source, args.question)
+    else:
+        jobs = jobs_from_manifest(args.source, args.question)
+    summary = run_batch(
+        jobs,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        progress_path=args.progress,
+        reports_dir=args.reports_dir
+    )
+    print(
+        f"Graded {summary['graded']}/{summary['total']} submissions "
+        f"({summary['skipped']} already done, {summary['failed']} failed, {summary['cache_hits']} cache hits) "
+        f"in {summary['elapsed_seconds']}s - {summary['submissions_per_second']} submissions/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
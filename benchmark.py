@@ -0,0 +1,440 @@
+"""Latency benchmarks for the grading pipeline.
+
+Runs each stage on synthetic fixtures and writes the timings to a JSON file:
+
+    python benchmark.py run --output results.json
+    python benchmark.py run --quick --only extract_pdf render_report
+    python benchmark.py run --output current.json --compare baseline.json
+    python benchmark.py compare baseline.json current.json --threshold 0.2
+
+Benchmarks run in a temporary working directory with the stub model backend,
+so they need no network access. Every `STORAGE_*` setting is pointed into that
+directory, so a replica's shared database and caches are left alone.
+`compare` exits with status 1 when a benchmark's median got slower than the
+baseline by more than the threshold (a fraction, 0.2 = 20%).
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import statistics
+from datetime import datetime, timedelta
+
+DEFAULT_THRESHOLD = 0.2
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+# What the app imports on its first script run, before any file is extracted or report rendered
+COLD_IMPORT = "import utils, db_utils, eval_engine, feedback_utils, notebook_utils, csv_store, metrics"
+
+WORDS = (
+    "data model train test split feature score pandas numpy accuracy loss value column row "
+    "plot mean median regression cluster label predict sample result function return print"
+).split()
+
+
+def _upload(data, name):
+    """Wrap bytes as an in-memory upload with a `.name`, like Streamlit's UploadedFile."""
+    upload = io.BytesIO(data)
+    upload.name = name
+    return upload
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def make_pdf(pages=300, lines_per_page=40, seed=0):
+    """A text PDF with `pages` pages of filler sentences."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    for page in range(pages):
+        y = 750
+        pdf.drawString(72, y, f"Page {page + 1}")
+        for _ in range(lines_per_page):
+            y -= 16
+            pdf.drawString(72, y, _sentence(rng))
+        pdf.showPage()
+    pdf.save()
+    return _upload(buffer.getvalue(), "fixture.pdf")
+
+
+def make_notebook(cells=500, seed=0):
+    """An .ipynb with code cells carrying text, image and large table outputs."""
+    rng = random.Random(seed)
+    notebook_cells = []
+    for index in range(cells):
+        if index % 4 == 0:
+            notebook_cells.append({"cell_type": "markdown", "metadata": {}, "source": [f"## {_sentence(rng, 6)}"]})
+            continue
+        outputs = [{"output_type": "stream", "name": "stdout", "text": [_sentence(rng) + "\n"]}]
+        if index % 10 == 1:
+            outputs.append({
+                "output_type": "display_data",
+                "metadata": {},
+                "data": {"image/png": "iVBORw0KGgo" * 2000, "text/plain": ["<Figure>"]}
+            })
+        if index % 10 == 3:
+            table = "\n".join(" ".join(str(rng.random()) for _ in range(8)) for _ in range(200))
+            outputs.append({
+                "output_type": "execute_result",
+                "execution_count": index,
+                "metadata": {},
+                "data": {"text/plain": [table], "text/html": [f"<table>{table}</table>"]}
+            })
+        notebook_cells.append({
+            "cell_type": "code",
+            "execution_count": index,
+            "metadata": {},
+            "source": [f"x_{index} = {rng.choice(WORDS)}({rng.randint(0, 100)})\n", f"print(x_{index})\n"],
+            "outputs": outputs
+        })
+    notebook = {"cells": notebook_cells, "metadata": {}, "nbformat": 4, "nbformat_minor": 5}
+    return _upload(json.dumps(notebook).encode('utf-8'), "fixture.ipynb")
+
+
+def make_docx(paragraphs=2000, seed=0):
+    """A .docx with `paragraphs` paragraphs of filler text."""
+    import docx
+
+    rng = random.Random(seed)
+    document = docx.Document()
+    for _ in range(paragraphs):
+        document.add_paragraph(_sentence(rng, 30))
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return _upload(buffer.getvalue(), "fixture.docx")
+
+
+def make_submission_text(seed, words=1500):
+    """Random code-like answer text; distinct seeds stay below the near-duplicate threshold."""
+    rng = random.Random(seed)
+    return "\n".join(
+        f"{rng.choice(WORDS)}_{rng.randint(0, 10**6)} = {' '.join(rng.choice(WORDS) for _ in range(9))}"
+        for _ in range(words // 10)
+    )
+
+
+def make_rows(count=5000, students=200, seed=0):
+    """Submission rows spread over the last 90 days."""
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=90)
+    rows = []
+    for _ in range(count):
+        score = rng.randint(0, 10)
+        timestamp = start + timedelta(seconds=rng.randint(0, 90 * 24 * 3600))
+        result = "✅ Pass" if score >= 6 else "⚠️ Can Improve" if score >= 4 else "❌ Rework"
+        rows.append((
+            timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+            f"Student {rng.randint(1, students)}",
+            '',
+            "Benchmark question...",
+            score,
+            result
+        ))
+    return rows
+
+
+def measure(fn, repeat, setup=None):
+    """Time `repeat` calls of fn and return summary statistics in seconds.
+
+    `setup`, if given, runs untimed before each call and its result is passed to fn.
+    """
+    samples = []
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        "repeat": repeat,
+        "min": samples[0],
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "p95": samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+        "max": samples[-1]
+    }
+
+
+class Suite:
+    """Benchmarks sharing one set of fixtures, sized by `scale` (1.0 is the full suite)."""
+
+    def __init__(self, scale=1.0, repeat=5, latency=0.0):
+        self.scale = scale
+        self.repeat = repeat
+        self.latency = latency
+        self._seed = 0
+
+    def _scaled(self, value):
+        return max(1, int(value * self.scale))
+
+    def _next_seed(self):
+        self._seed += 1
+        return self._seed
+
+    def setup(self):
+        # Imported here so the caches and database are created inside the benchmark directory
+        import utils
+        import db_utils
+        from llm_backends import StubBackend
+
+        self.utils = utils
+        self.db_utils = db_utils
+        self.backend = StubBackend(latency=self.latency)
+        db_utils.DB_URL = None
+        db_utils.DB_PATH = os.path.abspath("benchmark.db")
+        db_utils.init_db()
+        self.pdf = make_pdf(pages=self._scaled(300))
+        self.notebook = make_notebook(cells=self._scaled(500))
+        self.docx = make_docx(paragraphs=self._scaled(2000))
+        self.question = "Build a regression model on the housing dataset and report its accuracy."
+        self.supporting_docs = make_submission_text(-1, words=self._scaled(3000))
+        self.rows = make_rows(count=self._scaled(5000))
+        db_utils.add_submissions(self.rows)
+        self.reply = self.backend.complete(make_submission_text(0))
+        self.feedback = self.utils.parse_feedback(self.reply)
+
+    def benchmarks(self):
+        return {
+            "extract_pdf": self.bench_extract_pdf,
+            "extract_pdf_cached": self.bench_extract_pdf_cached,
+            "extract_notebook": self.bench_extract_notebook,
+            "extract_docx": self.bench_extract_docx,
+            "build_prompt": self.bench_build_prompt,
+            "evaluate": self.bench_evaluate,
+            "evaluate_cached": self.bench_evaluate_cached,
+            "parse_feedback": self.bench_parse_feedback,
+            "render_report": self.bench_render_report,
+            "db_insert": self.bench_db_insert,
+            "db_query_page": self.bench_db_query_page,
+            "db_count": self.bench_db_count,
+            "db_leaderboard": self.bench_db_leaderboard,
+            "pipeline": self.bench_pipeline,
+            "cold_import": self.bench_cold_import
+        }
+
+    def _fresh(self, upload):
+        upload.seek(0)
+        return upload
+
+    def bench_extract_pdf(self):
+        return measure(lambda: self.utils._extract_text(self._fresh(self.pdf)), self.repeat)
+
+    def bench_extract_pdf_cached(self):
+        self.utils.extract_text_from_file(self._fresh(self.pdf))
+        return measure(lambda: self.utils.extract_text_from_file(self._fresh(self.pdf)), self.repeat)
+
+    def bench_extract_notebook(self):
+        return measure(lambda: self.utils._extract_text(self._fresh(self.notebook)), self.repeat)
+
+    def bench_extract_docx(self):
+        return measure(lambda: self.utils._extract_text(self._fresh(self.docx)), self.repeat)
+
+    def bench_build_prompt(self):
+        final_output = self.utils._extract_text(self._fresh(self.notebook))
+        return measure(lambda: self.utils.build_prompt(self.question, self.supporting_docs, final_output), self.repeat)
+
+    def bench_evaluate(self):
+        # Every run grades a new answer, so this is the cache-miss path through the stub model
+        return measure(
+            lambda final_output: self.utils.evaluate_submission(
+                self.question, self.supporting_docs, final_output, llm_client=self.backend
+            ),
+            self.repeat,
+            setup=lambda: make_submission_text(self._next_seed())
+        )
+
+    def bench_evaluate_cached(self):
+        final_output = make_submission_text(self._next_seed())
+        self.utils.evaluate_submission(self.question, self.supporting_docs, final_output, llm_client=self.backend)
+        return measure(
+            lambda: self.utils.evaluate_submission(
+                self.question, self.supporting_docs, final_output, llm_client=self.backend
+            ),
+            self.repeat
+        )
+
+    def bench_parse_feedback(self):
+        return measure(lambda: self.utils.parse_feedback(self.reply), self.repeat * 20)
+
+    def bench_render_report(self):
+        return measure(
+            lambda: self.utils.render_pdf_report("Benchmark Student", "Online", self.question, self.feedback, 7),
+            self.repeat
+        )
+
+    def bench_db_insert(self):
+        rows = self.rows[:self._scaled(500)]
+        return measure(lambda: self.db_utils.add_submissions(rows), self.repeat)
+
+    def bench_db_query_page(self):
+        return measure(lambda: self.db_utils.query_submissions(student_name="Student 1", limit=50), self.repeat * 20)
+
+    def bench_db_count(self):
+        return measure(lambda: self.db_utils.count_submissions(evaluation_result="✅ Pass"), self.repeat * 20)
+
+    def bench_db_leaderboard(self):
+        return measure(lambda: self.db_utils.get_weekly_leaderboard(), self.repeat * 20)
+
+    def _submit(self, final_output_upload):
+        question = self.question
+        final_output = self.utils.extract_text_from_file(final_output_upload)
+        _, feedback = self.utils.evaluate_submission(
+            question, self.supporting_docs, final_output, llm_client=self.backend, student_name="Benchmark Student"
+        )
+        score = feedback.score
+        self.utils.render_pdf_report("Benchmark Student", "Online", question, feedback, score)
+        self.db_utils.add_submission(
+            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "Benchmark Student",
+            "Online",
+            question[:200] + "...",
+            score,
+            self.utils.get_evaluation_result(score)
+        )
+
+    def bench_cold_import(self):
+        """Start-up cost of the app's imports in a fresh interpreter."""
+        env = {**os.environ, "PYTHONPATH": REPO_DIR}
+        return measure(
+            lambda: subprocess.run([sys.executable, "-c", COLD_IMPORT], check=True, env=env),
+            self.repeat
+        )
+
+    def bench_pipeline(self):
+        """Extract, grade, render and record a new .py submission end to end."""
+        result = measure(
+            self._submit,
+            self.repeat,
+            setup=lambda: _upload(make_submission_text(self._next_seed()).encode('utf-8'), "answer.py")
+        )
+        result["submissions_per_second"] = 1 / result["median"] if result["median"] else 0.0
+        return result
+
+
+def run(names=None, scale=1.0, repeat=5, latency=0.0):
+    """Run the named benchmarks (all by default) and return the results document."""
+    os.environ["LLM_BACKEND"] = "stub"
+    if "utils" in sys.modules or "db_utils" in sys.modules:
+        raise RuntimeError("Run benchmarks before importing utils or db_utils, so they use the benchmark's storage")
+    cwd = os.getcwd()
+    saved = {name: value for name, value in os.environ.items() if name.startswith("STORAGE_")}
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="skillshare-bench-") as workdir:
+        os.chdir(workdir)
+        for name in saved:
+            del os.environ[name]
+        # Empty values also override any [storage] secrets, so nothing reaches a shared database or cache
+        os.environ.update({
+            "STORAGE_CACHE_DIR": os.path.join(workdir, ".cache"),
+            "STORAGE_SHARED_CACHE_DIR": "",
+            "STORAGE_DB_PATH": os.path.join(workdir, "benchmark.db"),
+            "STORAGE_DB_URL": "",
+            "STORAGE_RECORDS_DIR": os.path.join(workdir, "submission_records")
+        })
+        try:
+            suite = Suite(scale=scale, repeat=repeat, latency=latency)
+            suite.setup()
+            benchmarks = suite.benchmarks()
+            for name in names or benchmarks:
+                if name not in benchmarks:
+                    raise ValueError(f"Unknown benchmark: {name}")
+                results[name] = benchmarks[name]()
+                print(f"{name:<20} median {results[name]['median'] * 1000:10.2f} ms  p95 {results[name]['p95'] * 1000:10.2f} ms")
+        finally:
+            os.chdir(cwd)
+            for name in [name for name in os.environ if name.startswith("STORAGE_")]:
+                del os.environ[name]
+            os.environ.update(saved)
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": scale,
+            "repeat": repeat,
+            "latency": latency
+        },
+        "benchmarks": results
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Compare medians of two results documents.
+
+    Returns (name, baseline seconds, current seconds, relative change, regressed) per
+    benchmark present in both.
+    """
+    rows = []
+    for name, result in current["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            continue
+        change = (result["median"] - before["median"]) / before["median"] if before["median"] else 0.0
+        rows.append((name, before["median"], result["median"], change, change > threshold))
+    return rows
+
+
+def print_comparison(rows, threshold):
+    print(f"{'benchmark':<20} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for name, before, after, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<20} {before * 1000:12.2f} {after * 1000:12.2f} {change:+8.1%}{flag}")
+    regressions = [row for row in rows if row[4]]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than the baseline by more than {threshold:.0%}")
+    return not regressions
+
+
+def _load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the grading pipeline on synthetic fixtures.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run benchmarks and write a results file")
+    run_parser.add_argument("--output", default="benchmark_results.json", help="Results JSON file")
+    run_parser.add_argument("--only", nargs="+", help="Run only these benchmarks")
+    run_parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    run_parser.add_argument("--scale", type=float, default=1.0, help="Fixture size multiplier")
+    run_parser.add_argument("--quick", action="store_true", help="Small fixtures and few runs (scale 0.1, repeat 3)")
+    run_parser.add_argument("--latency", type=float, default=0.0, help="Stub model latency in seconds")
+    run_parser.add_argument("--compare", help="Baseline results file to compare against")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown fraction")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown fraction")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        ok = print_comparison(compare(_load(args.baseline), _load(args.current), args.threshold), args.threshold)
+        return 0 if ok else 1
+
+    scale, repeat = (0.1, 3) if args.quick else (args.scale, args.repeat)
+    results = run(args.only, scale=scale, repeat=repeat, latency=args.latency)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        ok = print_comparison(compare(_load(args.compare), results, args.threshold), args.threshold)
+        return 0 if ok else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,431 @@
+import os
+import json
+import hashlib
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process locking is unavailable
+    fcntl = None
+
+
+class SQLiteCache:
+    """Single-file SQLite cache with LRU eviction, optional TTL and hit/miss counters.
+
+    A hit refreshes the entry's access time only when it is more than
+    `touch_interval` seconds old, so most reads do not write.
+    """
+
+    def __init__(self, path, max_entries=5000, max_bytes=50 * 1024 * 1024, ttl=None, touch_interval=60):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                size INTEGER,
+                created REAL,
+                accessed REAL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed)')
+        self._conn.commit()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, created, accessed FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created, accessed = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            if now - accessed > self.touch_interval:
+                self._conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+                self._conn.commit()
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value):
+        """Store a JSON-serialisable value and evict down to the configured bounds."""
+        self.set_many([(key, value)])
+
+    def set_many(self, items):
+        """Store (key, value) pairs in one transaction, evicting once at the end."""
+        now = time.time()
+        rows = []
+        for key, value in items:
+            payload = json.dumps(value)
+            rows.append((key, payload, len(payload.encode('utf-8')), now, now))
+        with self._lock:
+            self._conn.executemany('''
+                INSERT OR REPLACE INTO entries (key, value, size, created, accessed)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+            self._evict(now)
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            self._conn.commit()
+
+    def _evict(self, now):
+        if self.ttl is not None:
+            self._conn.execute('DELETE FROM entries WHERE created < ?', (now - self.ttl,))
+        count, total = self._conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+        ).fetchone()
+        # Drop least recently used entries until both bounds are satisfied
+        while count > self.max_entries or total > self.max_bytes:
+            row = self._conn.execute(
+                'SELECT key, size FROM entries ORDER BY accessed ASC LIMIT 1'
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute('DELETE FROM entries WHERE key = ?', (row[0],))
+            count -= 1
+            total -= row[1]
+
+    def stats(self):
+        """Return entry count, stored bytes and hit/miss counters."""
+        with self._lock:
+            count, total = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+            ).fetchone()
+        return {"entries": count, "bytes": total, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DirectoryCache:
+    """SQLiteCache counterpart for a directory shared by several hosts (e.g. an NFS mount).
+
+    Each entry is a JSON file, written to a temp file and renamed into place so
+    readers never see partial writes; the modification time doubles as the LRU
+    access time. Eviction sweeps run under a lock file so only one process
+    sweeps at a time, every `sweep_every` writes from a given process.
+    """
+
+    def __init__(self, path, max_entries=5000, max_bytes=50 * 1024 * 1024, ttl=None, sweep_every=50):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_every = sweep_every
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._writes = 0
+        os.makedirs(path, exist_ok=True)
+
+    def _entry_path(self, key):
+        # Shard on the key prefix so no single directory grows too large
+        return os.path.join(self.path, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        now = time.time()
+        if self.ttl is not None and now - entry["created"] > self.ttl:
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass  # Evicted by another process since the read
+        with self._lock:
+            self.hits += 1
+        return entry["value"]
+
+    def set(self, key, value):
+        """Store a JSON-serialisable value; every sweep_every writes, evict down to the bounds."""
+        self.set_many([(key, value)])
+
+    def set_many(self, items):
+        """Store (key, value) pairs, sweeping at most once at the end."""
+        written = 0
+        for key, value in items:
+            path = self._entry_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"created": time.time(), "value": value}, f)
+            os.replace(temp_path, path)
+            written += 1
+        with self._lock:
+            due = (self._writes + written) // self.sweep_every > self._writes // self.sweep_every
+            self._writes += written
+        if due:
+            self.sweep()
+
+    def delete(self, key):
+        self._remove(self._entry_path(key))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _entries(self):
+        """Yield (path, size, accessed) for every entry file."""
+        for shard in os.scandir(self.path):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def sweep(self):
+        """Drop expired entries, then least recently used ones until both bounds are satisfied."""
+        with file_lock(os.path.join(self.path, "sweep.lock")):
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            if self.ttl is not None:
+                # mtime is the last access, so this is a conservative TTL; get() enforces the exact one
+                cutoff = time.time() - self.ttl
+                while entries and entries[0][2] < cutoff:
+                    self._remove(entries.pop(0)[0])
+            count = len(entries)
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if count <= self.max_entries and total <= self.max_bytes:
+                    break
+                self._remove(path)
+                count -= 1
+                total -= size
+
+    def stats(self):
+        """Return entry count, stored bytes and this process's hit/miss counters."""
+        count = total = 0
+        for _, size, _ in self._entries():
+            count += 1
+            total += size
+        return {"entries": count, "bytes": total, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        pass
+
+
+class MemoryCache:
+    """In-process LRU cache bounded by entry count and approximate size."""
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = len(value) if isinstance(value, (str, bytes)) else len(json.dumps(value))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def delete(self, key):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+class TieredCache:
+    """Memory tier in front of a disk tier; disk hits are promoted into memory."""
+
+    def __init__(self, memory, disk):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        self.disk.set(key, value)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        self.disk.delete(key)
+
+    def stats(self):
+        return {"memory": self.memory.stats(), "disk": self.disk.stats()}
+
+
+def migrate_legacy_cache(cache, legacy_dir, batch_size=1000):
+    """Import old `<sha256>.json` files from legacy_dir into cache and remove them.
+
+    Files are stored batch_size at a time with cache.set_many, so a large
+    directory costs one transaction and one eviction pass per batch.
+    """
+    if not os.path.isdir(legacy_dir):
+        return 0
+    migrated = 0
+    batch = []
+
+    def store(batch):
+        cache.set_many((key, cached) for key, cached, _ in batch)
+        for _, _, path in batch:
+            os.remove(path)
+        return len(batch)
+
+    with os.scandir(legacy_dir) as entries:
+        for entry in entries:
+            stem, ext = os.path.splitext(entry.name)
+            if ext != '.json' or len(stem) != 64:
+                continue
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+            except (OSError, ValueError):
+                continue
+            batch.append((stem, cached, entry.path))
+            if len(batch) >= batch_size:
+                migrated += store(batch)
+                batch = []
+    if batch:
+        migrated += store(batch)
+    return migrated
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive advisory lock on path for the duration of the block."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextmanager
+def key_lock(f, key):
+    """Hold an exclusive lock on one byte of the open file f, chosen by hashing key.
+
+    Unrelated keys land on different bytes, so one lock file serves every key
+    without serialising them. These are POSIX record locks: they exclude other
+    processes, not other threads of this one.
+    """
+    if fcntl is None:
+        yield
+        return
+    offset = int(hashlib.sha256(key.encode('utf-8')).hexdigest()[:15], 16)
+    fcntl.lockf(f, fcntl.LOCK_EX, 1, offset)
+    try:
+        yield
+    finally:
+        fcntl.lockf(f, fcntl.LOCK_UN, 1, offset)
+
+
+class SingleFlight:
+    """Collapse concurrent calls sharing a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait for and share its result. With lock_dir set, leaders in other
+    processes take a per-key lock so only one of them does the work at a time.
+    """
+
+    def __init__(self, lock_dir=None):
+        self.lock_dir = lock_dir
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._lock_file = None
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+            # Kept open for the process lifetime: closing any descriptor of the file drops all its record locks
+            self._lock_file = open(os.path.join(lock_dir, "flights.lock"), 'a')
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result()
+        try:
+            if self._lock_file is not None:
+                # Same-key callers in this process are already waiting on `call`, so a process-wide lock suffices
+                with key_lock(self._lock_file, key):
+                    result = fn()
+            else:
+                result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
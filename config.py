@@ -0,0 +1,25 @@
+import os
+
+
+def get_setting(section, key, default=None):
+    """Read a setting from the environment, then Streamlit secrets, then fall back to default.
+
+    The environment variable is `<SECTION>_<KEY>` upper-cased, e.g. OPENAI_API_KEY
+    for ("openai", "api_key"), so scripts and benchmarks run without Streamlit.
+    """
+    value = os.environ.get(f"{section}_{key}".upper())
+    if value is not None:
+        return value
+    try:
+        import streamlit as st
+        return st.secrets[section][key]
+    except Exception:
+        return default
+
+
+def get_bool_setting(section, key, default=False):
+    """Read a setting as a boolean; accepts TOML booleans from secrets and "true"/"1"/"yes" strings."""
+    value = get_setting(section, key)
+    if value is None:
+        return default
+    return str(value).strip().lower() in ("true", "1", "yes", "on")
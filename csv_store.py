@@ -0,0 +1,145 @@
+import os
+import csv
+import threading
+from contextlib import contextmanager
+
+from cache_utils import file_lock
+
+
+class CsvJournalStore:
+    """Append-only CSV of submissions with tombstone deletes.
+
+    New rows are appended to the CSV itself. Deleting a row only appends its ID
+    to a small `<csv>.deleted` journal, so each delete is O(1) (the tombstone
+    count is kept in memory and only journal lines written by other processes
+    are read); `rows()` hides
+    deleted IDs, and `compact()` rewrites the CSV once to drop them for good.
+    Until then, readers of the raw CSV still see the deleted rows.
+
+    Writes also take a `<csv>.lock` file lock, so processes sharing the CSV
+    (replicas on a shared volume) can append, delete and compact safely. The
+    lock and compaction temp files sit beside the CSV, since they must be on the
+    same volume, so anything that commits the directory should skip `*.lock`
+    and `*.tmp` (GitSyncWorker does).
+    """
+
+    def __init__(self, path, fields, id_field="ID", compact_after=100):
+        self.path = path
+        self.fields = fields
+        self.id_field = id_field
+        self.journal_path = f"{path}.deleted"
+        self.lock_path = f"{path}.lock"
+        self.compact_after = compact_after
+        self._lock = threading.Lock()
+        self._append_file = None
+        self._writer = None
+        # Journal (inode, bytes read) and the tombstones counted up to there
+        self._journal_seen = (None, 0)
+        self._tombstones = 0
+
+    @contextmanager
+    def _locked(self):
+        with self._lock, file_lock(self.lock_path):
+            yield
+
+    def _open_for_append(self):
+        if self._append_file is not None and self._replaced():
+            # Another process compacted the CSV; appends to the old file would be lost
+            self._close_append()
+        if self._append_file is None:
+            needs_header = not os.path.isfile(self.path) or os.path.getsize(self.path) == 0
+            self._append_file = open(self.path, 'a', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._append_file, fieldnames=self.fields)
+            if needs_header:
+                self._writer.writeheader()
+        return self._writer
+
+    def _replaced(self):
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._append_file.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _close_append(self):
+        if self._append_file is not None:
+            self._append_file.close()
+            self._append_file = None
+            self._writer = None
+
+    def append(self, row):
+        with self._locked():
+            self._open_for_append().writerow(row)
+            self._append_file.flush()
+
+    def delete(self, row_id):
+        """Record a tombstone for row_id, compacting once enough have accumulated."""
+        with self._locked():
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(f"{row_id}\n")
+            self._count_new_tombstones()
+            if self._tombstones >= self.compact_after:
+                self._compact()
+
+    def _count_new_tombstones(self):
+        """Bring the tombstone count up to date, reading only journal bytes not seen yet. Call under the lock."""
+        try:
+            stat = os.stat(self.journal_path)
+        except FileNotFoundError:
+            self._journal_seen = (None, 0)
+            self._tombstones = 0
+            return
+        inode, offset = self._journal_seen
+        if inode != stat.st_ino or offset > stat.st_size:
+            # Compacted and recreated, possibly by another process
+            offset = 0
+            self._tombstones = 0
+        if stat.st_size > offset:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+            self._tombstones += data.count(b"\n")
+            offset += len(data)
+        self._journal_seen = (stat.st_ino, offset)
+
+    def _deleted_ids(self):
+        if not os.path.isfile(self.journal_path):
+            return set()
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def rows(self):
+        """Yield the current rows, skipping deleted ones, without loading the whole file."""
+        with self._lock:
+            deleted = self._deleted_ids()
+            if self._append_file is not None:
+                self._append_file.flush()
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, 'r', newline='', encoding='utf-8') as csvfile:
+            for row in csv.DictReader(csvfile):
+                if str(row[self.id_field]) not in deleted:
+                    yield row
+
+    def compact(self):
+        """Rewrite the CSV without deleted rows and clear the journal."""
+        with self._locked():
+            self._compact()
+
+    def _compact(self):
+        deleted = self._deleted_ids()
+        if not deleted:
+            return
+        self._close_append()
+        if os.path.isfile(self.path):
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(self.path, 'r', newline='', encoding='utf-8') as src, \
+                    open(tmp_path, 'w', newline='', encoding='utf-8') as dst:
+                writer = csv.DictWriter(dst, fieldnames=self.fields)
+                writer.writeheader()
+                for row in csv.DictReader(src):
+                    if str(row[self.id_field]) not in deleted:
+                        writer.writerow(row)
+            os.replace(tmp_path, self.path)
+        os.remove(self.journal_path)
+        self._journal_seen = (None, 0)
+        self._tombstones = 0
@@ -1,45 +1,375 @@
 import sqlite3
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 
-DB_PATH = "submissions.db"
+from config import get_setting
+from metrics import span
+
+DB_PATH = get_setting("storage", "db_path", "submissions.db")
+# URL of a remote_db.py server shared by several app replicas; when set it replaces DB_PATH
+DB_URL = get_setting("storage", "db_url")
+DB_TOKEN = get_setting("storage", "db_token")
+BUSY_TIMEOUT_MS = 30000
+# Idle connections kept open per database location; busier moments open extra ones and close them after
+POOL_SIZE = 8
+EXPORT_CHUNK_SIZE = 5000
+
+_pools = {}
+_pools_lock = threading.Lock()
+_init_lock = threading.Lock()
+_initialized_paths = set()
+
+def _location():
+    return DB_URL or DB_PATH
+
+def _open_connection():
+    if DB_URL:
+        from remote_db import RemoteConnection
+        return RemoteConnection(DB_URL, DB_TOKEN)
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=256, check_same_thread=False)
+    # WAL lets readers carry on while a write is in progress
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+@contextmanager
+def connection():
+    """Borrow a connection to DB_URL or DB_PATH from the shared pool for the duration of the block.
+
+    Streamlit runs every rerun on a fresh thread, so connections are pooled per
+    process rather than per thread; a connection is used by one thread at a time.
+    """
+    location = _location()
+    with _pools_lock:
+        pool = _pools.setdefault(location, queue.LifoQueue())
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        if pool.qsize() < POOL_SIZE:
+            pool.put(conn)
+        else:
+            conn.close()
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS submissions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            student_name TEXT,
-            institution TEXT,
-            question_summary TEXT,
-            score INTEGER,
-            evaluation_result TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    """Create the schema once per process and database location."""
+    if _location() in _initialized_paths:
+        return
+    with _init_lock:
+        if _location() in _initialized_paths:
+            return
+        with connection() as conn, conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS submissions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT,
+                    student_name TEXT,
+                    institution TEXT,
+                    question_summary TEXT,
+                    score INTEGER,
+                    evaluation_result TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_submissions_timestamp ON submissions (timestamp)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_submissions_student_name ON submissions (student_name)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_submissions_score ON submissions (score)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS daily_counts (
+                    date TEXT PRIMARY KEY,
+                    submissions INTEGER
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS result_counts (
+                    evaluation_result TEXT PRIMARY KEY,
+                    submissions INTEGER
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS student_weekly (
+                    week TEXT,
+                    student_name TEXT,
+                    submissions INTEGER,
+                    total_score REAL,
+                    best_score REAL,
+                    PRIMARY KEY (week, student_name)
+                )
+            ''')
+            # Durable evaluation jobs; see job_queue.py
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS evaluation_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cache_key TEXT,
+                    student_name TEXT,
+                    state TEXT,
+                    stage TEXT,
+                    partial TEXT,
+                    attempts INTEGER,
+                    error TEXT,
+                    question_summary TEXT,
+                    question TEXT,
+                    supporting_docs TEXT,
+                    final_output TEXT,
+                    result TEXT,
+                    feedback TEXT,
+                    score REAL,
+                    evaluation_result TEXT,
+                    created REAL,
+                    started REAL,
+                    finished REAL,
+                    heartbeat REAL,
+                    worker TEXT,
+                    token TEXT,
+                    UNIQUE (cache_key, student_name)
+                )
+            ''')
+            job_columns = {row[1] for row in conn.execute('PRAGMA table_info(evaluation_jobs)').fetchall()}
+            if 'token' not in job_columns:
+                # Job tables created before jobs had tokens: give every existing job one
+                conn.execute('ALTER TABLE evaluation_jobs ADD COLUMN token TEXT')
+                conn.execute('UPDATE evaluation_jobs SET token = lower(hex(randomblob(16))) WHERE token IS NULL')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_evaluation_jobs_state ON evaluation_jobs (state, id)')
+            conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_evaluation_jobs_token ON evaluation_jobs (token)')
+            # Token buckets for admission control; see rate_limit.py
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL,
+                    updated REAL
+                )
+            ''')
+        # Databases created before the aggregate tables existed need one full build
+        with connection() as conn:
+            has_submissions = conn.execute('SELECT 1 FROM submissions LIMIT 1').fetchone()
+            has_aggregates = conn.execute('SELECT 1 FROM daily_counts LIMIT 1').fetchone()
+        if has_submissions and not has_aggregates:
+            rebuild_aggregates()
+        _initialized_paths.add(_location())
+
+SUBMISSION_COLUMNS = ("id", "timestamp", "student_name", "institution", "question_summary", "score", "evaluation_result")
+
+INSERT_SUBMISSION = '''
+    INSERT INTO submissions (timestamp, student_name, institution, question_summary, score, evaluation_result)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+# Aggregates are keyed by calendar date and by the Monday starting each week
+WEEK_OF = "date({}, 'weekday 0', '-6 days')"
+
+def _insert_submissions(conn, rows):
+    """Insert rows and fold them into the aggregate tables; the caller owns the transaction."""
+    conn.executemany(INSERT_SUBMISSION, rows)
+    conn.executemany('''
+        INSERT INTO daily_counts (date, submissions) VALUES (substr(?, 1, 10), 1)
+        ON CONFLICT (date) DO UPDATE SET submissions = submissions + 1
+    ''', [(row[0],) for row in rows])
+    conn.executemany('''
+        INSERT INTO result_counts (evaluation_result, submissions) VALUES (?, 1)
+        ON CONFLICT (evaluation_result) DO UPDATE SET submissions = submissions + 1
+    ''', [(row[5],) for row in rows])
+    conn.executemany(f'''
+        INSERT INTO student_weekly (week, student_name, submissions, total_score, best_score)
+        VALUES ({WEEK_OF.format('?')}, ?, 1, ?, ?)
+        ON CONFLICT (week, student_name) DO UPDATE SET
+            submissions = submissions + 1,
+            total_score = total_score + excluded.total_score,
+            best_score = MAX(best_score, excluded.best_score)
+    ''', [(row[0], row[1], row[4], row[4]) for row in rows])
+
+def _rebuild_student_week(conn, week, student_name):
+    conn.execute('DELETE FROM student_weekly WHERE week = ? AND student_name = ?', (week, student_name))
+    conn.execute(f'''
+        INSERT INTO student_weekly (week, student_name, submissions, total_score, best_score)
+        SELECT {WEEK_OF.format('timestamp')}, student_name, COUNT(*), SUM(score), MAX(score)
+        FROM submissions
+        WHERE student_name = ? AND {WEEK_OF.format('timestamp')} = ?
+        GROUP BY 1, 2
+    ''', (student_name, week))
+
+AGGREGATE_QUERIES = {
+    "daily_counts": '''
+        SELECT substr(timestamp, 1, 10), COUNT(*) FROM submissions GROUP BY 1
+    ''',
+    "result_counts": '''
+        SELECT evaluation_result, COUNT(*) FROM submissions GROUP BY 1
+    ''',
+    "student_weekly": f'''
+        SELECT {WEEK_OF.format('timestamp')}, student_name, COUNT(*), SUM(score), MAX(score)
+        FROM submissions GROUP BY 1, 2
+    '''
+}
+
+def rebuild_aggregates():
+    """Recompute every aggregate table from a full scan of submissions."""
+    with connection() as conn, conn:
+        for table, query in AGGREGATE_QUERIES.items():
+            conn.execute(f'DELETE FROM {table}')
+            conn.execute(f'INSERT INTO {table} {query}')
+
+def check_aggregates():
+    """Compare the aggregate tables with a full scan. Returns the names of tables that differ."""
+    with connection() as conn:
+        mismatched = []
+        for table, query in AGGREGATE_QUERIES.items():
+            expected = sorted(conn.execute(query).fetchall())
+            actual = sorted(conn.execute(f'SELECT * FROM {table}').fetchall())
+            if expected != actual:
+                mismatched.append(table)
+        return mismatched
 
 def add_submission(timestamp, student_name, institution, question_summary, score, evaluation_result):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO submissions (timestamp, student_name, institution, question_summary, score, evaluation_result)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (timestamp, student_name, institution, question_summary, score, evaluation_result))
-    conn.commit()
-    conn.close()
+    with span("db_write"):
+        init_db()
+        with connection() as conn, conn:
+            _insert_submissions(conn, [(timestamp, student_name, institution, question_summary, score, evaluation_result)])
+
+def add_submissions(rows):
+    """Insert many (timestamp, student_name, institution, question_summary, score, evaluation_result) rows in one transaction."""
+    with span("db_bulk_write"):
+        init_db()
+        with connection() as conn, conn:
+            _insert_submissions(conn, rows)
 
 def get_all_submissions():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('SELECT * FROM submissions')
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    with connection() as conn:
+        return conn.execute('SELECT * FROM submissions').fetchall()
+
+def iter_submissions(after_id=0, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of up to chunk_size submissions with id > after_id, in id order.
+
+    Each chunk is a separate keyset query, so memory stays flat however many rows there are.
+    """
+    while True:
+        with span("db_query"):
+            with connection() as conn:
+                rows = conn.execute(
+                    'SELECT * FROM submissions WHERE id > ? ORDER BY id LIMIT ?', (after_id, chunk_size)
+                ).fetchall()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
 
 def delete_submission(submission_id):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('DELETE FROM submissions WHERE id = ?', (submission_id,))
-    conn.commit()
-    conn.close()
+    with connection() as conn, conn:
+        row = conn.execute(
+            f'SELECT substr(timestamp, 1, 10), {WEEK_OF.format("timestamp")}, student_name, evaluation_result '
+            'FROM submissions WHERE id = ?',
+            (submission_id,)
+        ).fetchone()
+        if row is None:
+            return
+        date, week, student_name, evaluation_result = row
+        conn.execute('DELETE FROM submissions WHERE id = ?', (submission_id,))
+        conn.execute('UPDATE daily_counts SET submissions = submissions - 1 WHERE date = ?', (date,))
+        conn.execute('DELETE FROM daily_counts WHERE submissions <= 0')
+        conn.execute(
+            'UPDATE result_counts SET submissions = submissions - 1 WHERE evaluation_result IS ?',
+            (evaluation_result,)
+        )
+        conn.execute('DELETE FROM result_counts WHERE submissions <= 0')
+        # The best score may have been the deleted row, so recompute this student's week
+        _rebuild_student_week(conn, week, student_name)
+
+SORT_COLUMNS = ("timestamp", "student_name", "score", "id")
+
+def _filter_clause(student_name=None, evaluation_result=None, since=None, until=None):
+    conditions = []
+    params = []
+    if student_name:
+        conditions.append("student_name LIKE ?")
+        params.append(f"%{student_name}%")
+    if evaluation_result:
+        conditions.append("evaluation_result = ?")
+        params.append(evaluation_result)
+    if since:
+        conditions.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        conditions.append("timestamp < ?")
+        params.append(until)
+    return conditions, params
+
+def query_submissions(student_name=None, evaluation_result=None, since=None, until=None,
+                      order_by="timestamp", descending=True, after=None, limit=50):
+    """Return one page of submissions plus the cursor for the next page.
+
+    `after` is the cursor returned with the previous page; the next cursor is
+    None once there are no more rows.
+    """
+    if order_by not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort submissions by {order_by!r}")
+    conditions, params = _filter_clause(student_name, evaluation_result, since, until)
+    direction = "DESC" if descending else "ASC"
+    if after is not None:
+        # Keyset pagination: continue strictly after the last (sort value, id) seen
+        conditions.append(f"({order_by}, id) {'<' if descending else '>'} (?, ?)")
+        params.extend(after)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with span("db_query"):
+        with connection() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM submissions {where} ORDER BY {order_by} {direction}, id {direction} LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = (last[SUBMISSION_COLUMNS.index(order_by)], last[0])
+    return rows, next_cursor
+
+def count_submissions(student_name=None, evaluation_result=None, since=None, until=None):
+    conditions, params = _filter_clause(student_name, evaluation_result, since, until)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM submissions {where}", params).fetchone()[0]
+
+def get_daily_counts():
+    with connection() as conn:
+        return conn.execute('SELECT date, submissions FROM daily_counts ORDER BY date').fetchall()
+
+def get_result_counts():
+    with connection() as conn:
+        return conn.execute(
+            'SELECT evaluation_result, submissions FROM result_counts ORDER BY submissions DESC'
+        ).fetchall()
+
+def get_weekly_leaderboard(week=None, limit=50):
+    """Return (student_name, best_score, average_score, submissions) for a week, best first.
+
+    `week` is the Monday starting the week as YYYY-MM-DD; defaults to the current week.
+    """
+    if week is None:
+        today = datetime.now().date()
+        week = (today - timedelta(days=today.weekday())).isoformat()
+    with connection() as conn:
+        return conn.execute('''
+            SELECT student_name, best_score, total_score / submissions, submissions
+            FROM student_weekly
+            WHERE week = ?
+            ORDER BY best_score DESC, student_name
+            LIMIT ?
+        ''', (week, limit)).fetchall()
+
+if __name__ == "__main__":
+    import sys
+
+    init_db()
+    if sys.argv[1:] == ["rebuild"]:
+        rebuild_aggregates()
+        print("Aggregates rebuilt.")
+    elif sys.argv[1:] == ["check"]:
+        mismatched = check_aggregates()
+        print("Aggregates consistent." if not mismatched else f"Inconsistent aggregates: {', '.join(mismatched)}")
+        sys.exit(1 if mismatched else 0)
+    else:
+        print("Usage: python db_utils.py [rebuild|check]")
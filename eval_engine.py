@@ -0,0 +1,99 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import evaluate_submission
+
+
+class EvaluationProgress:
+    """Latest stage and streamed reply of a background evaluation, polled by the UI thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage = "queued"
+        self.text = ""
+        self.attempt = 0
+
+    def update(self, stage, text=None):
+        with self._lock:
+            self.stage = stage
+            if text is not None:
+                self.text = text
+
+    def retrying(self, attempt):
+        with self._lock:
+            self.stage = "retrying"
+            self.text = ""
+            self.attempt = attempt
+
+    def snapshot(self):
+        """Return (stage, reply text so far, retry attempt)."""
+        with self._lock:
+            return self.stage, self.text, self.attempt
+
+
+class EvaluationEngine:
+    """Bounded worker pool that runs evaluate_submission jobs in the background.
+
+    Jobs are submitted with `submit` and return a concurrent.futures.Future of
+    (feedback text, Feedback) the UI can poll with `done()` or wait on with `result()`.
+    Pass an EvaluationProgress to follow the job's stage and streamed reply meanwhile.
+    """
+
+    def __init__(self, max_workers=4, timeout=120, max_retries=3, backoff=1.0,
+                 llm_client=None, retry_on=None):
+        if retry_on is None:
+            import openai
+
+            retry_on = (openai.RateLimitError, openai.APITimeoutError)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.llm_client = llm_client
+        self.retry_on = retry_on
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="evaluation")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def submit(self, question, supporting_docs, final_output, student_name=None, progress=None):
+        """Queue an evaluation and return its Future."""
+        with self._lock:
+            self._in_flight += 1
+        future = self._executor.submit(self._run, question, supporting_docs, final_output, student_name, progress)
+        future.add_done_callback(self._job_finished)
+        return future
+
+    def _job_finished(self, future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _run(self, question, supporting_docs, final_output, student_name=None, progress=None):
+        attempt = 0
+        while True:
+            try:
+                return evaluate_submission(
+                    question,
+                    supporting_docs,
+                    final_output,
+                    llm_client=self.llm_client,
+                    timeout=self.timeout,
+                    student_name=student_name,
+                    on_progress=progress.update if progress else None
+                )
+            except self.retry_on:
+                if attempt >= self.max_retries:
+                    raise
+                if progress:
+                    progress.retrying(attempt + 1)
+                # Exponential backoff with full jitter so retries from many jobs spread out
+                time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+                attempt += 1
+
+    def pending(self):
+        """Number of jobs queued or running."""
+        with self._lock:
+            return self._in_flight
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,206 @@
+"""Export the submissions table for offline analysis.
+
+Rows are read from db_utils in id-ordered chunks, so memory stays flat
+however large the table is:
+
+    python export.py csv --output submissions.csv
+    python export.py parquet --output-dir exports/submissions
+    python export.py feather --output-dir exports/submissions --incremental
+
+Columnar exports are zstd-compressed and partitioned by submission date
+(`date=YYYY-MM-DD/part-<first id>.parquet`), readable as one dataset with
+`pyarrow.dataset.dataset(path, format="parquet", partitioning="hive")`; they
+need pyarrow. With --incremental, only rows newer than the export's
+watermark are written (appended to the CSV, or as new partition files), and
+the watermark advances after every chunk, so an interrupted export resumes
+where it stopped. Deletions are not replayed into incremental exports; run a
+full export to drop them.
+"""
+import io
+import os
+import csv
+import json
+import argparse
+import threading
+from datetime import datetime
+
+from db_utils import init_db, iter_submissions, SUBMISSION_COLUMNS, EXPORT_CHUNK_SIZE
+
+FORMATS = ("csv", "parquet", "feather")
+COMPRESSION = "zstd"
+WATERMARK_NAME = "_watermark.json"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def read_watermark(path):
+    """Return the last exported submission id recorded at path, or 0."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)["last_id"]
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+def write_watermark(path, last_id):
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({"last_id": last_id, "updated": datetime.now().strftime(TIMESTAMP_FORMAT)}, f)
+    os.replace(temp_path, path)
+
+
+def iter_csv(after_id=0, header=SUBMISSION_COLUMNS, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the submissions after after_id as UTF-8 CSV, one encoded chunk at a time.
+
+    Pass header=None to leave out the header row.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(header)
+    for rows in iter_submissions(after_id, chunk_size):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')  # Header of an empty export
+
+
+def export_csv(path, incremental=False, header=SUBMISSION_COLUMNS, chunk_size=EXPORT_CHUNK_SIZE):
+    """Write submissions to a CSV file and return the number of rows written.
+
+    A full export replaces the file atomically; an incremental one appends the
+    rows newer than `<path>.watermark.json`.
+    """
+    init_db()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    watermark_path = f"{path}.watermark.json"
+    appending = incremental and os.path.isfile(path)
+    after_id = read_watermark(watermark_path) if appending else 0
+    target = path if appending else f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    written = 0
+    with open(target, 'a' if appending else 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if not appending:
+            writer.writerow(header)
+        for rows in iter_submissions(after_id, chunk_size):
+            writer.writerows(rows)
+            written += len(rows)
+            after_id = rows[-1][0]
+            if appending:
+                f.flush()
+                write_watermark(watermark_path, after_id)
+    if not appending:
+        os.replace(target, path)
+        write_watermark(watermark_path, after_id)
+    return written
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Parquet and Feather exports need pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _schema(pa):
+    return pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", pa.timestamp("s")),
+        ("student_name", pa.string()),
+        ("institution", pa.string()),
+        ("question_summary", pa.string()),
+        ("score", pa.float64()),
+        ("evaluation_result", pa.string())
+    ])
+
+
+def _to_table(pa, rows):
+    schema = _schema(pa)
+    arrays = []
+    for column, field in zip(zip(*rows), schema):
+        if field.name == "timestamp":
+            # Stored as text; unparseable timestamps become nulls rather than failing the export
+            arrays.append(pa.compute.strptime(
+                pa.array(column, pa.string()), format=TIMESTAMP_FORMAT, unit="s", error_is_null=True
+            ))
+        else:
+            arrays.append(pa.array(column, field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _write_partition(pa, table, path, fmt):
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    if fmt == "parquet":
+        pa.parquet.write_table(table, temp_path, compression=COMPRESSION)
+    else:
+        pa.feather.write_feather(table, temp_path, compression=COMPRESSION)
+    os.replace(temp_path, path)
+
+
+def export_columnar(output_dir, fmt="parquet", incremental=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Write submissions as date-partitioned Parquet or Feather files; return the number of rows written.
+
+    Each chunk becomes one file per date it covers. A full export clears the
+    previous partition files first.
+    """
+    if fmt not in ("parquet", "feather"):
+        raise ValueError(f"Unknown columnar format {fmt!r}")
+    pa = _import_pyarrow()
+    init_db()
+    os.makedirs(output_dir, exist_ok=True)
+    watermark_path = os.path.join(output_dir, WATERMARK_NAME)
+    if incremental:
+        after_id = read_watermark(watermark_path)
+    else:
+        after_id = 0
+        _clear_partitions(output_dir, fmt)
+    written = 0
+    for rows in iter_submissions(after_id, chunk_size):
+        by_date = {}
+        for row in rows:
+            by_date.setdefault(str(row[1])[:10], []).append(row)
+        for date, date_rows in by_date.items():
+            partition = os.path.join(output_dir, f"date={date}")
+            os.makedirs(partition, exist_ok=True)
+            path = os.path.join(partition, f"part-{date_rows[0][0]:010d}.{fmt}")
+            _write_partition(pa, _to_table(pa, date_rows), path, fmt)
+        written += len(rows)
+        write_watermark(watermark_path, rows[-1][0])
+    if not incremental and not written:
+        write_watermark(watermark_path, 0)
+    return written
+
+
+def _clear_partitions(output_dir, fmt):
+    for entry in os.scandir(output_dir):
+        if entry.is_dir() and entry.name.startswith("date="):
+            for name in os.listdir(entry.path):
+                if name.endswith(f".{fmt}"):
+                    os.remove(os.path.join(entry.path, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export submissions for offline analysis")
+    parser.add_argument("format", choices=FORMATS)
+    parser.add_argument("--output", default="submissions_export.csv", help="CSV file (csv format)")
+    parser.add_argument("--output-dir", default=os.path.join("exports", "submissions"),
+                        help="Partitioned dataset directory (parquet and feather formats)")
+    parser.add_argument("--incremental", action="store_true", help="Only export rows newer than the last export")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+    if args.format == "csv":
+        written = export_csv(args.output, args.incremental, chunk_size=args.chunk_size)
+        target = args.output
+    else:
+        written = export_columnar(args.output_dir, args.format, args.incremental, args.chunk_size)
+        target = args.output_dir
+    print(f"Exported {written} submission(s) to {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import re
+import json
+from dataclasses import dataclass, field, asdict
+
+SECTION_PATTERN = re.compile(
+    r"^[#*\s]*(STRENGTHS|AREAS FOR IMPROVEMENT|SCORE BREAKDOWN|TOTAL SCORE|FINAL VERDICT)\s*\**\s*:\s*\**\s*(.*)$",
+    re.IGNORECASE
+)
+NUMBER_PATTERN = re.compile(r"([0-9]+(?:\.[0-9]+)?)")
+SCORE_LINE_PATTERN = re.compile(r"SCORE:\s*([0-9]+(?:\.[0-9]+)?)", re.IGNORECASE)
+CRITERION_SCORE_PATTERN = re.compile(r"([0-9]+(?:\.[0-9]+)?)\s*/\s*([0-9]+(?:\.[0-9]+)?)\s*[–-]?\s*(.*)")
+# A JSON string field that may still be cut off mid-value while the reply streams in
+PARTIAL_FIELD_PATTERN = r'"{}"\s*:\s*"((?:[^"\\]|\\.)*)'
+PREVIEW_FIELDS = (
+    ("strengths", "STRENGTHS"),
+    ("areas_for_improvement", "AREAS FOR IMPROVEMENT"),
+    ("final_verdict", "FINAL VERDICT")
+)
+
+
+@dataclass
+class Criterion:
+    name: str
+    score: float = None
+    out_of: float = None
+    explanation: str = ""
+
+    @property
+    def display_score(self):
+        if self.score is None or self.out_of is None:
+            return ""
+        return f"{self.score:g}/{self.out_of:g}"
+
+
+@dataclass
+class Feedback:
+    """Structured form of the model's feedback, shared by the UI, PDF, DB and CSV paths."""
+    strengths: str = ""
+    improvements: str = ""
+    criteria: list = field(default_factory=list)
+    total: float = None
+    verdict: str = ""
+
+    @property
+    def score(self):
+        return self.total if self.total is not None else 0
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            strengths=data.get("strengths", ""),
+            improvements=data.get("improvements", ""),
+            criteria=[Criterion(**criterion) for criterion in data.get("criteria", [])],
+            total=data.get("total"),
+            verdict=data.get("verdict", "")
+        )
+
+
+def _to_float(value):
+    """A number, or the leading number of a string such as "8/10", or None."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    match = NUMBER_PATTERN.search(value) if isinstance(value, str) else None
+    return float(match.group(1)) if match else None
+
+
+def parse_feedback_json(text):
+    """Parse the JSON response format, returning None if text is not a JSON feedback object."""
+    stripped = text.strip()
+    if stripped.startswith("```"):
+        stripped = stripped.strip("`")
+        stripped = stripped[stripped.find("{"):]
+    if not stripped.startswith("{"):
+        return None
+    try:
+        data = json.loads(stripped)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    breakdown = data.get("score_breakdown")
+    if not isinstance(breakdown, list):
+        breakdown = []
+    criteria = [
+        Criterion(
+            name=str(item.get("criterion", "")),
+            score=_to_float(item.get("score")),
+            out_of=_to_float(item.get("out_of")),
+            explanation=str(item.get("explanation", ""))
+        )
+        for item in breakdown
+        if isinstance(item, dict)
+    ]
+    return Feedback(
+        strengths=str(data.get("strengths", "")).strip(),
+        improvements=str(data.get("areas_for_improvement", "")).strip(),
+        criteria=criteria,
+        total=_to_float(data.get("total_score")),
+        verdict=str(data.get("final_verdict", "")).strip()
+    )
+
+
+def parse_feedback_text(text):
+    """Scan the legacy plain-text feedback format once, line by line."""
+    sections = {}
+    current = None
+    fallback_score = None
+    for line in text.splitlines():
+        if fallback_score is None:
+            match = SCORE_LINE_PATTERN.search(line)
+            if match:
+                fallback_score = float(match.group(1))
+        match = SECTION_PATTERN.match(line)
+        if match:
+            current = match.group(1).upper()
+            sections.setdefault(current, [])
+            line = match.group(2)
+        if current is not None:
+            sections[current].append(line)
+
+    feedback = Feedback(
+        strengths="\n".join(sections.get("STRENGTHS", [])).strip(),
+        improvements="\n".join(sections.get("AREAS FOR IMPROVEMENT", [])).strip(),
+        verdict="\n".join(sections.get("FINAL VERDICT", [])).strip()
+    )
+    for line in sections.get("SCORE BREAKDOWN", []):
+        line = line.replace('**', '').strip()
+        if not line or ':' not in line or line.startswith('-') or line.startswith('*'):
+            continue
+        name, rest = (part.strip() for part in line.split(':', 1))
+        match = CRITERION_SCORE_PATTERN.match(rest)
+        if match:
+            feedback.criteria.append(
+                Criterion(name, float(match.group(1)), float(match.group(2)), match.group(3).strip())
+            )
+        else:
+            feedback.criteria.append(Criterion(name, explanation=rest))
+    total_lines = " ".join(sections.get("TOTAL SCORE", []))
+    match = NUMBER_PATTERN.search(total_lines)
+    feedback.total = float(match.group(1)) if match else fallback_score
+    return feedback
+
+
+def parse_feedback(text):
+    """Parse model feedback in either the JSON or the legacy plain-text format."""
+    if not text:
+        return Feedback()
+    return parse_feedback_json(text) or parse_feedback_text(text)
+
+
+def _partial_string(raw):
+    # Drop an escape sequence cut off at the end of the chunk before decoding
+    raw = re.sub(r'\\(u[0-9a-fA-F]{0,3})?$', '', raw)
+    try:
+        return json.loads(f'"{raw}"')
+    except ValueError:
+        return raw
+
+
+def preview_partial_feedback(text):
+    """Render the text fields of a partially streamed JSON reply, for showing while it arrives."""
+    if not text.lstrip().startswith(("{", "```")):
+        return text
+    sections = []
+    for key, label in PREVIEW_FIELDS:
+        match = re.search(PARTIAL_FIELD_PATTERN.format(key), text)
+        if match:
+            sections.append(f"{label}:\n{_partial_string(match.group(1))}")
+    return "\n\n".join(sections)
+
+
+def _format_criterion(criterion):
+    if criterion.display_score:
+        return f"{criterion.name}: {criterion.display_score} – {criterion.explanation}"
+    return f"{criterion.name}: {criterion.explanation}"
+
+
+def format_feedback(feedback):
+    """Render structured feedback in the plain-text layout shown to students."""
+    breakdown = "\n".join(_format_criterion(criterion) for criterion in feedback.criteria)
+    total = f"{feedback.total:g}/10" if feedback.total is not None else ""
+    return (
+        f"STRENGTHS:\n{feedback.strengths}\n\n"
+        f"AREAS FOR IMPROVEMENT:\n{feedback.improvements}\n\n"
+        f"SCORE BREAKDOWN:\n{breakdown}\n\n"
+        f"TOTAL SCORE: {total}\n\n"
+        f"FINAL VERDICT:\n{feedback.verdict}"
+    )
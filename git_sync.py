@@ -0,0 +1,160 @@
+import time
+import threading
+from datetime import datetime
+
+import git
+
+# Lock and temp files that record stores keep beside their files; never committed
+EXCLUDE_PATTERNS = ("*.lock", "*.tmp")
+
+
+class GitSyncWorker:
+    """Background worker that batches record changes into one commit and push.
+
+    Callers `notify()` after changing files under `paths`; the worker waits until
+    no new change has arrived for `debounce` seconds (or `max_wait` has passed
+    since the first one), then stages the paths (minus files matching
+    `exclude`), commits once and pushes with retries. Pushes that still fail
+    are retried on the next sync.
+    """
+
+    def __init__(self, repo_path, paths, remote_url=None, remote_name='origin',
+                 debounce=10.0, max_wait=60.0, max_retries=3, backoff=2.0, retry_interval=60.0,
+                 exclude=EXCLUDE_PATTERNS):
+        self.repo_path = repo_path
+        self.paths = list(paths)
+        self.exclude = list(exclude)
+        self.remote_url = remote_url
+        self.remote_name = remote_name
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.retry_interval = retry_interval
+        self._condition = threading.Condition()
+        self._messages = []
+        self._first_change = None
+        self._last_change = None
+        self._push_pending = False
+        self._last_attempt = None
+        self._syncing = False
+        self._stopped = False
+        self.last_sync = None
+        self.last_commit = None
+        self.last_error = None
+        self._thread = threading.Thread(target=self._run, name="git-sync", daemon=True)
+        self._thread.start()
+
+    def notify(self, message):
+        """Record a change to be included in the next commit."""
+        now = time.monotonic()
+        with self._condition:
+            self._messages.append(message)
+            if self._first_change is None:
+                self._first_change = now
+            self._last_change = now
+            self._condition.notify_all()
+
+    def status(self):
+        with self._condition:
+            return {
+                "pending": len(self._messages),
+                "push_pending": self._push_pending,
+                "last_sync": self.last_sync,
+                "last_commit": self.last_commit,
+                "last_error": self.last_error
+            }
+
+    def flush(self, timeout=None):
+        """Sync pending changes now and wait until the worker is idle."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._first_change = self._last_change = float('-inf') if self._messages else None
+            self._condition.notify_all()
+            while self._messages or self._syncing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _due_in(self):
+        now = time.monotonic()
+        if not self._messages:
+            if self._push_pending:
+                # Nothing new to commit, but an earlier push failed
+                return max(0.0, self._last_attempt + self.retry_interval - now)
+            return None
+        return max(0.0, min(self._last_change + self.debounce, self._first_change + self.max_wait) - now)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    due_in = self._due_in()
+                    if due_in == 0:
+                        break
+                    self._condition.wait(due_in)
+                if self._stopped:
+                    return
+                messages = self._messages
+                self._messages = []
+                self._first_change = self._last_change = None
+                self._syncing = True
+            try:
+                self._sync(messages)
+            finally:
+                with self._condition:
+                    self._syncing = False
+                    self._condition.notify_all()
+
+    def _sync(self, messages):
+        with self._condition:
+            self._last_attempt = time.monotonic()
+        commit = None
+        try:
+            repo = git.Repo(self.repo_path)
+            repo.git.add('-A', '--', *self.paths, *(f":(exclude,glob)**/{pattern}" for pattern in self.exclude))
+            if repo.is_dirty(index=True, working_tree=False):
+                if len(messages) == 1:
+                    commit_message = messages[0]
+                else:
+                    commit_message = f"Sync {len(messages)} submission record changes\n\n" + \
+                        "\n".join(f"- {message}" for message in messages)
+                commit = repo.index.commit(commit_message).hexsha
+            self._push(repo)
+        except Exception as e:
+            error = str(e)
+            if self.remote_url:
+                # Push errors echo the command line, which may carry credentials
+                error = error.replace(self.remote_url, self.remote_name)
+            with self._condition:
+                if commit is not None:
+                    self.last_commit = commit
+                self._push_pending = True
+                self.last_error = error
+        else:
+            with self._condition:
+                if commit is not None:
+                    self.last_commit = commit
+                self._push_pending = False
+                self.last_sync = datetime.now()
+                self.last_error = None
+
+    def _push(self, repo):
+        branch = repo.active_branch.name
+        target = self.remote_url or self.remote_name
+        for attempt in range(self.max_retries + 1):
+            try:
+                repo.git.push(target, f"HEAD:refs/heads/{branch}")
+                return
+            except git.GitCommandError:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt))
@@ -0,0 +1,348 @@
+"""Durable evaluation jobs stored next to `submissions` in the SQLite database.
+
+A submission is enqueued once per (evaluation cache key, student); enqueueing
+it again returns the existing job, so reloads and resubmissions never pay for
+a second model call. Workers claim queued jobs, keep a heartbeat while they
+run, and on success record the graded submission in the same transaction that
+marks the job done. Jobs whose worker stopped heartbeating (a crash or a
+restart) go back to the queue.
+
+The app runs a worker in-process by default (`jobs.inline_worker`); a
+separate worker process can drain the queue instead:
+
+    python job_queue.py work --workers 4
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import argparse
+import threading
+from datetime import datetime
+
+from db_utils import init_db, connection, _insert_submissions
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+# A running job whose worker has not heartbeated for LEASE_SECONDS is requeued, up to MAX_ATTEMPTS times
+LEASE_SECONDS = 300
+HEARTBEAT_INTERVAL = 10
+MAX_ATTEMPTS = 3
+# Streamed replies are written back at most this often, for UIs polling from other processes
+PROGRESS_INTERVAL = 0.5
+
+JOB_COLUMNS = (
+    "id", "token", "cache_key", "student_name", "state", "stage", "partial", "attempts", "error",
+    "question_summary", "result", "feedback", "score", "evaluation_result",
+    "created", "started", "finished", "heartbeat", "worker"
+)
+
+
+def enqueue_job(question, supporting_docs, final_output, student_name):
+    """Queue an evaluation and return (job id, token); an existing job for the same input and student is reused.
+
+    The token is an unguessable handle for the job that is safe to put in a
+    URL, unlike the sequential id. Failed jobs are reset to queued so the
+    student can try again.
+    """
+    from utils import get_cache_key
+
+    init_db()
+    cache_key = get_cache_key(question, supporting_docs, final_output)
+    now = time.time()
+    with connection() as conn, conn:
+        conn.execute('''
+            INSERT INTO evaluation_jobs (token, cache_key, student_name, state, stage, attempts, question_summary,
+                                         question, supporting_docs, final_output, created)
+            VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?)
+            ON CONFLICT (cache_key, student_name) DO UPDATE SET
+                state = excluded.state,
+                stage = excluded.stage,
+                attempts = 0,
+                error = NULL,
+                question = excluded.question,
+                supporting_docs = excluded.supporting_docs,
+                final_output = excluded.final_output,
+                created = excluded.created
+            WHERE evaluation_jobs.state = 'failed'
+        ''', (uuid.uuid4().hex, cache_key, student_name, QUEUED, QUEUED, question[:200] + "...",
+              question, supporting_docs, final_output, now))
+        return tuple(conn.execute(
+            'SELECT id, token FROM evaluation_jobs WHERE cache_key = ? AND student_name = ?', (cache_key, student_name)
+        ).fetchone())
+
+
+def get_job(job_id):
+    """Return the job as a dict (without its input texts), or None if there is no such job."""
+    with connection() as conn:
+        row = conn.execute(
+            f'SELECT {", ".join(JOB_COLUMNS)} FROM evaluation_jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+    if row is None:
+        return None
+    job = dict(zip(JOB_COLUMNS, row))
+    job["feedback"] = json.loads(job["feedback"]) if job["feedback"] else None
+    return job
+
+
+def find_job_by_token(token):
+    """Return the id of the job with this token, or None."""
+    with connection() as conn:
+        row = conn.execute('SELECT id FROM evaluation_jobs WHERE token = ?', (token,)).fetchone()
+    return row[0] if row else None
+
+
+def find_job(cache_key, student_name):
+    """Return (id, state) of the job for this input and student, or None."""
+    with connection() as conn:
+        return conn.execute(
+            'SELECT id, state FROM evaluation_jobs WHERE cache_key = ? AND student_name = ?', (cache_key, student_name)
+        ).fetchone()
+
+
+def count_jobs(state):
+    with connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM evaluation_jobs WHERE state = ?', (state,)).fetchone()[0]
+
+
+def claim_job(worker):
+    """Mark the oldest queued job as running for `worker` and return (id, question, supporting_docs,
+    final_output, student_name, cache_key), or None when the queue is empty."""
+    with connection() as conn:
+        now = time.time()
+        # IMMEDIATE takes the write lock up front so two workers cannot claim the same job
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('''
+                SELECT id, question, supporting_docs, final_output, student_name, cache_key
+                FROM evaluation_jobs WHERE state = ? ORDER BY id LIMIT 1
+            ''', (QUEUED,)).fetchone()
+            if row is not None:
+                conn.execute('''
+                    UPDATE evaluation_jobs
+                    SET state = ?, stage = ?, partial = NULL, attempts = attempts + 1,
+                        started = ?, heartbeat = ?, worker = ?
+                    WHERE id = ?
+                ''', (RUNNING, QUEUED, now, now, worker, row[0]))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return row
+
+
+def release_job(job_id):
+    """Put a job claimed by claim_job back at the head of the queue without counting the attempt."""
+    with connection() as conn, conn:
+        conn.execute('''
+            UPDATE evaluation_jobs SET state = ?, stage = ?, attempts = attempts - 1, started = NULL, worker = NULL
+            WHERE id = ? AND state = ?
+        ''', (QUEUED, QUEUED, job_id, RUNNING))
+
+
+def heartbeat(job_ids):
+    if not job_ids:
+        return
+    with connection() as conn, conn:
+        conn.executemany(
+            'UPDATE evaluation_jobs SET heartbeat = ? WHERE id = ? AND state = ?',
+            [(time.time(), job_id, RUNNING) for job_id in job_ids]
+        )
+
+
+def requeue_stale_jobs(lease=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+    """Put running jobs whose worker went quiet back in the queue, or fail them after max_attempts."""
+    cutoff = time.time() - lease
+    with connection() as conn, conn:
+        conn.execute('''
+            UPDATE evaluation_jobs SET state = ?, error = 'Worker stopped responding', finished = ?
+            WHERE state = ? AND heartbeat < ? AND attempts >= ?
+        ''', (FAILED, time.time(), RUNNING, cutoff, max_attempts))
+        return conn.execute('''
+            UPDATE evaluation_jobs SET state = ?, stage = ?, partial = NULL, worker = NULL
+            WHERE state = ? AND heartbeat < ?
+        ''', (QUEUED, QUEUED, RUNNING, cutoff)).rowcount
+
+
+def complete_job(job_id, result, feedback):
+    """Store the grading and record the submission in one transaction."""
+    from utils import get_evaluation_result
+
+    now = datetime.now()
+    score = feedback.score
+    evaluation_result = get_evaluation_result(score)
+    with connection() as conn, conn:
+        student_name, question_summary, state = conn.execute(
+            'SELECT student_name, question_summary, state FROM evaluation_jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        if state != RUNNING:
+            return  # Requeued after its lease ran out; the new attempt records it
+        conn.execute('''
+            UPDATE evaluation_jobs
+            SET state = ?, stage = ?, partial = NULL, result = ?, feedback = ?, score = ?, evaluation_result = ?,
+                finished = ?, question = NULL, supporting_docs = NULL, final_output = NULL
+            WHERE id = ?
+        ''', (DONE, DONE, result, json.dumps(feedback.to_dict()), score, evaluation_result, now.timestamp(), job_id))
+        _insert_submissions(conn, [(
+            now.strftime('%Y-%m-%d %H:%M:%S'),
+            student_name,
+            '',  # Institution removed
+            question_summary,
+            score,
+            evaluation_result
+        )])
+
+
+def fail_job(job_id, error):
+    with connection() as conn, conn:
+        conn.execute(
+            'UPDATE evaluation_jobs SET state = ?, error = ?, partial = NULL, finished = ? WHERE id = ? AND state = ?',
+            (FAILED, error, time.time(), job_id, RUNNING)
+        )
+
+
+class JobProgress:
+    """EvaluationProgress counterpart that writes a job's stage and streamed reply to its row."""
+
+    def __init__(self, job_id, interval=PROGRESS_INTERVAL):
+        self.job_id = job_id
+        self.interval = interval
+        self._stage = None
+        self._written = 0.0
+
+    def update(self, stage, text=None):
+        now = time.monotonic()
+        if stage == self._stage and now - self._written < self.interval:
+            return
+        self._stage = stage
+        self._written = now
+        with connection() as conn, conn:
+            if text is None:
+                conn.execute('UPDATE evaluation_jobs SET stage = ? WHERE id = ?', (stage, self.job_id))
+            else:
+                conn.execute(
+                    'UPDATE evaluation_jobs SET stage = ?, partial = ? WHERE id = ?', (stage, text, self.job_id)
+                )
+
+    def retrying(self, attempt):
+        self._stage = None
+        self.update("retrying", "")
+
+
+class JobWorker:
+    """Drains the job queue through an EvaluationEngine, never holding more jobs than it has workers.
+
+    With an AdmissionController, each job that needs a model call also takes a
+    token from the global bucket; jobs already in the evaluation cache start
+    without one. When the bucket is empty the job goes back to the queue and the
+    worker pauses until a token is due.
+    """
+
+    def __init__(self, engine, capacity, poll_interval=0.5, name=None, admission=None):
+        self.engine = engine
+        self.capacity = capacity
+        self.poll_interval = poll_interval
+        self.admission = admission
+        self._paused_until = 0.0
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._running = set()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="job-worker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        init_db()
+        last_heartbeat = 0.0
+        while not self._stopped.is_set():
+            if time.monotonic() - last_heartbeat >= HEARTBEAT_INTERVAL:
+                with self._lock:
+                    running = list(self._running)
+                heartbeat(running)
+                requeue_stale_jobs()
+                last_heartbeat = time.monotonic()
+            if not self._claim_available():
+                self._stopped.wait(self.poll_interval)
+
+    def _claim_available(self):
+        """Start queued jobs while there is spare capacity. Returns whether any job was started."""
+        started = False
+        while True:
+            with self._lock:
+                if len(self._running) >= self.capacity:
+                    return started
+            if self.admission is not None and time.monotonic() < self._paused_until:
+                return started
+            row = claim_job(self.name)
+            if row is None:
+                return started
+            job_id, question, supporting_docs, final_output, student_name, cache_key = row
+            if self.admission is not None and not self._is_cached(cache_key):
+                acquired, retry_after = self.admission.acquire_global()
+                if not acquired:
+                    release_job(job_id)
+                    self._paused_until = time.monotonic() + retry_after
+                    return started
+            with self._lock:
+                self._running.add(job_id)
+            future = self.engine.submit(
+                question, supporting_docs, final_output, student_name=student_name, progress=JobProgress(job_id)
+            )
+            future.add_done_callback(lambda future, job_id=job_id: self._finished(job_id, future))
+            started = True
+
+    def _is_cached(self, cache_key):
+        from utils import get_cached_evaluation
+
+        return get_cached_evaluation(cache_key, self.engine.llm_client) is not None
+
+    def _finished(self, job_id, future):
+        try:
+            result, feedback = future.result()
+            complete_job(job_id, result, feedback)
+        except Exception as e:
+            fail_job(job_id, str(e) or type(e).__name__)
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drain the evaluation job queue")
+    parser.add_argument("command", choices=["work", "status"])
+    parser.add_argument("--workers", type=int, default=4, help="Evaluations in flight")
+    parser.add_argument("--timeout", type=float, default=120, help="Model call timeout in seconds")
+    args = parser.parse_args()
+    init_db()
+    if args.command == "status":
+        print(", ".join(f"{state}: {count_jobs(state)}" for state in (QUEUED, RUNNING, DONE, FAILED)))
+        return
+    from eval_engine import EvaluationEngine
+    from rate_limit import AdmissionController
+    from utils import migrate_legacy_evaluations
+    from metrics import registry as metrics_registry
+
+    metrics_registry.process = "worker"
+    migrate_legacy_evaluations()
+
+    worker = JobWorker(
+        EvaluationEngine(max_workers=args.workers, timeout=args.timeout),
+        capacity=args.workers,
+        admission=AdmissionController.from_settings()
+    )
+    print(f"Worker {worker.name} draining the job queue with {args.workers} workers")
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
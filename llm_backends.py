@@ -0,0 +1,323 @@
+"""Model backends for grading submissions.
+
+Every backend exposes `complete(prompt, timeout=None)`, which returns the model's
+reply text, and `stream(prompt, timeout=None)`, which yields it in chunks as it
+is generated. The backend is picked by the `llm.backend` setting (env LLM_BACKEND):
+
+- "openai": the OpenAI API (default)
+- "http": any OpenAI-compatible chat completions server at `llm.url`, such as
+  `python llm_backends.py serve`, a stub server for load tests
+- "stub": an in-process deterministic stub with configurable latency and errors
+
+Run a local stand-in server with:
+    python llm_backends.py serve --port 8089 --latency 0.5 --error-rate 0.02
+"""
+import json
+import random
+import hashlib
+import argparse
+import itertools
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from config import get_setting
+from prompt_utils import SCORE_CRITERIA
+
+DEFAULT_MODEL = "gpt-4.1-nano"
+DEFAULT_HTTP_URL = "http://127.0.0.1:8089/v1"
+# The stub splits each reply into this many streamed chunks
+STREAM_CHUNKS = 20
+
+
+class OpenAIBackend:
+    """Chat completions through the OpenAI client, created on first use."""
+
+    def __init__(self, api_key=None, model=DEFAULT_MODEL, base_url=None):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_namespace(self):
+        """Names this backend and model in evaluation cache keys, so their gradings are cached apart."""
+        return f"openai:{self.model}"
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                import openai
+
+                self._client = openai.OpenAI(api_key=self.api_key, base_url=self.base_url)
+            return self._client
+
+    def complete(self, prompt, timeout=None):
+        request_options = {"timeout": timeout} if timeout is not None else {}
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.0,
+            response_format={"type": "json_object"},
+            **request_options
+        )
+        return response.choices[0].message.content
+
+    def stream(self, prompt, timeout=None):
+        request_options = {"timeout": timeout} if timeout is not None else {}
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.0,
+            response_format={"type": "json_object"},
+            stream=True,
+            **request_options
+        )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class HTTPBackend(OpenAIBackend):
+    """An OpenAI-compatible server, e.g. a local stand-in; no real key is needed."""
+
+    def __init__(self, url=DEFAULT_HTTP_URL, model=DEFAULT_MODEL, api_key="local"):
+        super().__init__(api_key=api_key, model=model, base_url=url)
+
+    @property
+    def cache_namespace(self):
+        return f"http:{self.base_url}:{self.model}"
+
+
+class StubBackend:
+    """Deterministic offline backend for load tests.
+
+    The reply depends only on the prompt, so repeated runs grade identically.
+    Latency is drawn from a normal distribution (`latency` mean, `jitter` standard
+    deviation, never negative); `error_rate` of calls raise APITimeoutError and
+    `rate_limit_rate` raise RateLimitError, from a seeded random sequence.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0, seed=0, sleep=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sleep = sleep or threading.Event().wait
+        self.calls = 0
+
+    cache_namespace = "stub"
+
+    def _draw(self):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            roll = self._random.random()
+        return delay, roll
+
+    def complete(self, prompt, timeout=None):
+        return "".join(self.stream(prompt, timeout))
+
+    def stream(self, prompt, timeout=None):
+        """Yield the reply in STREAM_CHUNKS pieces, spreading the latency between them."""
+        delay, roll = self._draw()
+        if timeout is not None and delay > timeout:
+            self._sleep(timeout)
+            raise _stub_error(504)
+        self._sleep(delay / STREAM_CHUNKS)
+        if roll < self.error_rate:
+            raise _stub_error(504)
+        if roll < self.error_rate + self.rate_limit_rate:
+            raise _stub_error(429)
+        reply = stub_reply(prompt)
+        size = -(-len(reply) // STREAM_CHUNKS)
+        for start in range(0, len(reply), size):
+            if start:
+                self._sleep(delay / STREAM_CHUNKS)
+            yield reply[start:start + size]
+
+
+def _stub_error(status):
+    """The exception the OpenAI client raises for a timeout (504) or rate limit (429)."""
+    # Imported here so the stub, like the other backends, loads the client library only when used
+    import httpx
+    import openai
+
+    request = httpx.Request("POST", "stub://chat/completions")
+    if status == 429:
+        return openai.RateLimitError("Stub rate limit", response=httpx.Response(429, request=request), body=None)
+    return openai.APITimeoutError(request=request)
+
+
+def stub_reply(prompt):
+    """A JSON feedback object in the prompt's rubric, with scores derived from the prompt's hash."""
+    digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+    breakdown = [
+        {
+            "criterion": name,
+            "score": round(out_of * (0.4 + 0.6 * digest[i] / 255) * 2) / 2,
+            "out_of": out_of,
+            "explanation": "Stub evaluation."
+        }
+        for i, (name, out_of) in enumerate(SCORE_CRITERIA)
+    ]
+    return json.dumps({
+        "strengths": "Stub evaluation: the submission addresses the question.",
+        "areas_for_improvement": "Stub evaluation: no real model was consulted.",
+        "score_breakdown": breakdown,
+        "total_score": sum(item["score"] for item in breakdown),
+        "final_verdict": "Generated by the stub backend."
+    })
+
+
+def _float_setting(key, default):
+    return float(get_setting("llm", key, default))
+
+
+def create_backend(name=None):
+    """Build the backend named by `name`, or by the `llm.backend` setting."""
+    name = (name or get_setting("llm", "backend", "openai")).lower()
+    model = get_setting("llm", "model", DEFAULT_MODEL)
+    if name == "openai":
+        return OpenAIBackend(api_key=get_setting("openai", "api_key"), model=model)
+    if name == "http":
+        return HTTPBackend(url=get_setting("llm", "url", DEFAULT_HTTP_URL), model=model)
+    if name == "stub":
+        return StubBackend(
+            latency=_float_setting("latency", 0.0),
+            jitter=_float_setting("jitter", 0.0),
+            error_rate=_float_setting("error_rate", 0.0),
+            rate_limit_rate=_float_setting("rate_limit_rate", 0.0),
+            seed=int(get_setting("llm", "seed", 0))
+        )
+    raise ValueError(f"Unknown LLM backend: {name}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The configured backend, created on first use and shared by all callers."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend()
+        return _backend
+
+
+def make_stub_handler(backend):
+    import openai
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+            prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+            if body.get("stream"):
+                self._stream(backend.stream(prompt), body.get("model", DEFAULT_MODEL))
+                return
+            try:
+                content = backend.complete(prompt)
+            except openai.RateLimitError:
+                self._send_json(429, {"error": {"message": "Stub rate limit", "type": "rate_limit"}})
+                return
+            except openai.APITimeoutError:
+                self._send_json(504, {"error": {"message": "Stub timeout", "type": "timeout"}})
+                return
+            self._send_json(200, {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body.get("model", DEFAULT_MODEL),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            })
+
+        def _stream(self, chunks, model):
+            """Send the reply as server-sent chat.completion.chunk events."""
+            try:
+                first = next(chunks, "")
+            except openai.RateLimitError:
+                self._send_json(429, {"error": {"message": "Stub rate limit", "type": "rate_limit"}})
+                return
+            except openai.APITimeoutError:
+                self._send_json(504, {"error": {"message": "Stub timeout", "type": "timeout"}})
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            for content in itertools.chain([first], chunks):
+                self._send_event({"delta": {"content": content}, "finish_reason": None}, model)
+            self._send_event({"delta": {}, "finish_reason": "stop"}, model)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def _send_event(self, choice, model):
+            payload = {
+                "id": "stub",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": model,
+                "choices": [{"index": 0, **choice}]
+            }
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def serve(host, port, backend):
+    server = ThreadingHTTPServer((host, port), make_stub_handler(backend))
+    print(f"Stub chat completions server on http://{host}:{port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in backed by the stub")
+    parser.add_argument("command", choices=["serve"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    serve(args.host, args.port, StubBackend(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Per-stage latency metrics for the submission pipeline.
+
+Stages are timed with `span`:
+
+    with span("extract", size=len(data)) as s:
+        text = cache.get(key)
+        s["cache"] = "hit" if text is not None else "miss"
+
+Durations go into per-(stage, cache) histograms. Each process exports its
+registry in the Prometheus text format to its own `<process>-<pid>.prom` file
+in METRICS_DIR, under the configured cache folder (rewritten at most every
+FLUSH_INTERVAL seconds), so the app and separate `job_queue.py work` or
+`batch.py` processes do not overwrite each other. Every series carries a
+`process` label, and the files are merged and served for scraping with:
+
+    python metrics.py serve --port 9108
+"""
+import os
+import glob
+import time
+import atexit
+import bisect
+import argparse
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from config import get_setting
+
+METRICS_DIR = os.path.join(get_setting("storage", "cache_dir", ".cache"), "metrics")
+FLUSH_INTERVAL = 5.0
+PREFIX = "skillshare"
+# Upper bounds in seconds, from a cache hit to a slow model call
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram; quantiles are interpolated within a bucket."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Thread-safe stage histograms and byte counters.
+
+    `process` names the kind of process ("app", "worker", "batch") in the file
+    name and labels; a `directory` of None turns the file export off.
+    """
+
+    def __init__(self, directory=METRICS_DIR, process="app", flush_interval=FLUSH_INTERVAL):
+        self.directory = directory
+        self.process = process
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._input_bytes = {}
+        self._last_flush = 0.0
+
+    def observe(self, stage, seconds, cache=None, size=None):
+        labels = (stage, cache or "none")
+        with self._lock:
+            histogram = self._histograms.get(labels)
+            if histogram is None:
+                histogram = self._histograms[labels] = Histogram()
+            histogram.observe(seconds)
+            if size is not None:
+                self._input_bytes[stage] = self._input_bytes.get(stage, 0) + size
+            due = self.directory and time.monotonic() - self._last_flush >= self.flush_interval
+            if due:
+                self._last_flush = time.monotonic()
+        if due:
+            self.flush()
+
+    @property
+    def path(self):
+        """This process's metrics file; the pid is read on each call, so forked children get their own."""
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, f"{self.process}-{os.getpid()}.prom")
+
+    def stage_summary(self):
+        """Return (stage, cache, count, p50, p95, mean) rows, sorted by stage."""
+        with self._lock:
+            return [
+                (stage, cache, h.count, h.quantile(0.5), h.quantile(0.95), h.sum / h.count)
+                for (stage, cache), h in sorted(self._histograms.items())
+            ]
+
+    def render(self):
+        """The registry in the Prometheus text exposition format."""
+        name = f"{PREFIX}_stage_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each submission pipeline stage.",
+            f"# TYPE {name} histogram"
+        ]
+        with self._lock:
+            process = f"{self.process}-{os.getpid()}"
+            for (stage, cache), h in sorted(self._histograms.items()):
+                labels = f'process="{process}",stage="{stage}",cache="{cache}"'
+                cumulative = 0
+                for bound, count in zip([f"{bound:g}" for bound in h.buckets] + ["+Inf"], h.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {h.sum}")
+                lines.append(f"{name}_count{{{labels}}} {h.count}")
+            lines.append(f"# HELP {PREFIX}_stage_input_bytes_total Bytes handled by each stage.")
+            lines.append(f"# TYPE {PREFIX}_stage_input_bytes_total counter")
+            for stage, total in sorted(self._input_bytes.items()):
+                lines.append(f'{PREFIX}_stage_input_bytes_total{{process="{process}",stage="{stage}"}} {total}')
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Atomically rewrite this process's metrics file."""
+        path = self.path
+        if not path:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(temp_path, path)
+        except OSError:
+            pass  # Metrics must never fail a submission
+
+    def remove(self):
+        """Delete this process's metrics file, so a stopped process is no longer scraped."""
+        path = self.path
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._input_bytes.clear()
+
+
+registry = MetricsRegistry()
+atexit.register(registry.remove)
+
+
+@contextmanager
+def span(stage, size=None, cache=None):
+    """Time the block as `stage`; set `cache` or `size` on the yielded dict to label it.
+
+    The duration is recorded even when the block raises.
+    """
+    labels = {"cache": cache, "size": size}
+    started = time.perf_counter()
+    try:
+        yield labels
+    finally:
+        registry.observe(stage, time.perf_counter() - started, labels["cache"], labels["size"])
+
+
+def merge_metrics(directory):
+    """The per-process metrics files in `directory` as one exposition, each metric family kept together."""
+    comments = {}
+    samples = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.prom"))):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            continue  # Removed by its process while we listed the folder
+        family = None
+        for line in lines:
+            if line.startswith("#"):
+                family = line.split()[2]
+                comments.setdefault(family, [])
+                if line not in comments[family]:
+                    comments[family].append(line)
+            elif line and family:
+                samples.setdefault(family, []).append(line)
+    lines = []
+    for family, header in comments.items():
+        lines.extend(header)
+        lines.extend(samples.get(family, []))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def make_metrics_handler(directory):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            data = merge_metrics(directory).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the metrics file at /metrics for Prometheus")
+    parser.add_argument("command", choices=["serve"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9108)
+    parser.add_argument("--dir", default=METRICS_DIR, help="Folder of per-process metrics files")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), make_metrics_handler(args.dir))
+    print(f"Metrics on http://{args.host}:{args.port}/metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
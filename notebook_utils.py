@@ -0,0 +1,75 @@
+import json
+
+# Text outputs up to this size are kept in the prompt; images, HTML and larger outputs are dropped
+MAX_OUTPUT_CHARS = 2000
+TEXT_OUTPUT_TYPES = ("text/plain",)
+
+
+def _join_source(source):
+    return "".join(source) if isinstance(source, list) else (source or "")
+
+
+def _output_text(output):
+    """Return (text, dropped_bytes) for a single code cell output."""
+    if output.get("output_type") == "stream":
+        text = _join_source(output.get("text"))
+        dropped = 0
+    elif output.get("output_type") == "error":
+        text = f"{output.get('ename', '')}: {output.get('evalue', '')}"
+        dropped = sum(len(line) for line in output.get("traceback", []))
+    else:
+        data = output.get("data", {})
+        text = _join_source(data.get("text/plain"))
+        dropped = sum(
+            len(_join_source(value)) if not isinstance(value, dict) else len(json.dumps(value))
+            for mime, value in data.items()
+            if mime not in TEXT_OUTPUT_TYPES
+        )
+    if len(text) > MAX_OUTPUT_CHARS:
+        dropped += len(text)
+        text = ""
+    return text, dropped
+
+
+def parse_notebook(raw):
+    """Parse .ipynb JSON once into prompt text plus the static checks shown in the UI.
+
+    Code and markdown cells are kept; heavy outputs (images, HTML, large
+    dataframes) are left out of the text and counted in `dropped_output_bytes`.
+    Raises ValueError when raw is not valid UTF-8 notebook JSON.
+    """
+    if isinstance(raw, bytes):
+        raw = raw.decode('utf-8')
+    notebook = json.loads(raw)
+    if not isinstance(notebook, dict) or not isinstance(notebook.get("cells", []), list):
+        raise ValueError("Not a Jupyter notebook")
+    parts = []
+    summary = {
+        "has_def": False,
+        "has_import": False,
+        "has_output": False,
+        "code_cells": 0,
+        "markdown_cells": 0,
+        "dropped_output_bytes": 0
+    }
+    for cell in notebook.get("cells", []):
+        if not isinstance(cell, dict):
+            continue
+        source = _join_source(cell.get("source"))
+        if cell.get("cell_type") == "code":
+            summary["code_cells"] += 1
+            summary["has_def"] = summary["has_def"] or "def " in source
+            summary["has_import"] = summary["has_import"] or "import " in source
+            parts.append(source)
+            outputs = cell.get("outputs", [])
+            summary["has_output"] = summary["has_output"] or bool(outputs)
+            for output in outputs:
+                text, dropped = _output_text(output)
+                summary["dropped_output_bytes"] += dropped
+                if text.strip():
+                    parts.append("# Output:\n" + text)
+        elif cell.get("cell_type") == "markdown":
+            summary["markdown_cells"] += 1
+            parts.append(source)
+    summary["text"] = "\n\n".join(part for part in parts if part.strip())
+    return summary
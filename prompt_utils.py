@@ -0,0 +1,177 @@
+import re
+import json
+
+# Token budget for the whole prompt and each section's share of it
+PROMPT_TOKEN_BUDGET = 24000
+SECTION_WEIGHTS = {"question": 1, "supporting_docs": 2, "final_output": 5}
+CSV_SAMPLE_ROWS = 20
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+DATA_URI_PATTERN = re.compile(r"data:[\w/+.-]+;base64,[A-Za-z0-9+/=\s]+")
+BASE64_RUN_PATTERN = re.compile(r"[A-Za-z0-9+/=]{200,}")
+
+
+def count_tokens(text):
+    """Estimate the token count locally (no tokenizer download).
+
+    Counts word and punctuation pieces, splitting long words into four-character
+    chunks the way BPE vocabularies roughly do.
+    """
+    if not text:
+        return 0
+    return sum(max(1, len(piece) // 4) for piece in TOKEN_PATTERN.findall(text))
+
+
+def strip_notebook_outputs(text):
+    """Drop cell outputs from notebook JSON and embedded base64 payloads from any text."""
+    stripped = text.lstrip()
+    if stripped.startswith('{') and '"cells"' in stripped:
+        try:
+            notebook = json.loads(stripped)
+        except ValueError:
+            notebook = None
+        if isinstance(notebook, dict) and isinstance(notebook.get("cells"), list):
+            cells = []
+            for cell in notebook["cells"]:
+                source = cell.get("source", "")
+                cells.append("".join(source) if isinstance(source, list) else source)
+            text = "\n\n".join(cells)
+    text = DATA_URI_PATTERN.sub("[base64 data removed]", text)
+    return BASE64_RUN_PATTERN.sub("[base64 data removed]", text)
+
+
+def looks_like_csv(lines):
+    if len(lines) < 3:
+        return False
+    for delimiter in (',', '\t', ';'):
+        columns = lines[0].count(delimiter)
+        if columns and sum(1 for line in lines if line.count(delimiter) == columns) >= 0.9 * len(lines):
+            return True
+    return False
+
+
+def sample_table(text, rows=CSV_SAMPLE_ROWS):
+    """Keep the header, first and last rows of CSV-like content."""
+    lines = text.splitlines()
+    if len(lines) <= 2 * rows + 1 or not looks_like_csv(lines):
+        return text
+    omitted = len(lines) - 2 * rows - 1
+    return "\n".join(lines[:rows + 1] + [f"... [{omitted} rows omitted] ..."] + lines[-rows:])
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Keep the head and tail of text so it fits roughly within max_tokens."""
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    keep_chars = int(len(text) * max_tokens / tokens)
+    head = text[:keep_chars * 2 // 3]
+    tail = text[len(text) - keep_chars // 3:] if keep_chars // 3 else ""
+    return f"{head}\n... [{tokens - max_tokens} tokens truncated] ...\n{tail}"
+
+
+def allocate_budgets(token_counts, total_budget, weights=SECTION_WEIGHTS):
+    """Split total_budget across sections by weight, handing unused share to the larger sections."""
+    budgets = {}
+    remaining = total_budget
+    pending = set(token_counts)
+    while pending:
+        weight_sum = sum(weights[name] for name in pending)
+        fits = {name for name in pending if token_counts[name] <= remaining * weights[name] / weight_sum}
+        if not fits:
+            for name in pending:
+                budgets[name] = int(remaining * weights[name] / weight_sum)
+            break
+        for name in fits:
+            budgets[name] = token_counts[name]
+            remaining -= token_counts[name]
+        pending -= fits
+    return budgets
+
+
+def prepare_section(text):
+    """Shrink a section that is over its budget before it is truncated."""
+    return sample_table(strip_notebook_outputs(text))
+
+
+# The score_breakdown the model is asked for: (criterion, marks); they add up to the total of 10
+SCORE_CRITERIA = (
+    ("Code Quality", 5),
+    ("Problem-Solving", 2),
+    ("Documentation", 2),
+    ("Best Practices", 1)
+)
+# Bump when the prompt or rubric changes, so cached gradings made under the old one are not reused
+PROMPT_VERSION = 1
+SCORE_BREAKDOWN_TEMPLATE = ",\n".join(
+    f'            {{"criterion": "{name}", "score": [score], "out_of": {out_of}, "explanation": "[brief explanation]"}}'
+    for name, out_of in SCORE_CRITERIA
+)
+
+
+def render_prompt(question, supporting_docs, final_output):
+    return f"""
+    You are Rohit Krishnan, a Business and Technology Strategist and an experienced Senior instructor at Boston Institute of Analytics. Analyze the following assignment submission with an encouraging and supporting tone and provide detailed feedback.
+
+    Question:
+    {question}
+    
+    Supporting Documents:
+    {supporting_docs}
+    
+    Final Output:
+    {final_output}
+    
+    Evaluate the submission based on these criteria (Total 10 marks):
+    1. Code Quality and Structure (5 marks) - Evaluate code organization, logic, efficiency, and structure
+    2. Problem-Solving Approach (2 marks) - Assess how well the problem was understood and solved
+    3. Documentation and Comments (2 marks) - Check for clear comments, documentation, and readability
+    4. Best Practices (1 mark) - Evaluate adherence to coding standards and best practices
+
+    Respond with a single JSON object in this EXACT shape:
+
+    {{
+        "strengths": "[Write a short paragraph summarizing the main strengths.]",
+        "areas_for_improvement": "[Write a short paragraph summarizing the main areas for improvement.]",
+        "score_breakdown": [
+{SCORE_BREAKDOWN_TEMPLATE}
+        ],
+        "total_score": [total score out of 10],
+        "final_verdict": "[Write a short paragraph with the final verdict and encouragement.]"
+    }}
+
+    IMPORTANT: Be consistent and objective in your scoring. Use the same criteria for similar submissions. Score must be a whole number or decimal (e.g., 7.5, 8.0).
+    """
+
+
+# Tokens used by the fixed instructions, reserved before splitting the budget between sections
+TEMPLATE_TOKENS = count_tokens(render_prompt("", "", ""))
+
+
+def build_prompt(question, supporting_docs, final_output, token_budget=PROMPT_TOKEN_BUDGET):
+    """Assemble the evaluation prompt within token_budget. Returns (prompt, token_count).
+
+    Sections within their share of the budget are used verbatim; only those over
+    it have outputs and base64 payloads stripped, tables sampled and, if still
+    too long, their middle truncated.
+    """
+    sections = {
+        "question": question or "",
+        "supporting_docs": supporting_docs or "",
+        "final_output": final_output or ""
+    }
+    available = token_budget - TEMPLATE_TOKENS
+    token_counts = {name: count_tokens(text) for name, text in sections.items()}
+    budgets = allocate_budgets(token_counts, available)
+    over_budget = [name for name in sections if token_counts[name] > budgets[name]]
+    for name in over_budget:
+        sections[name] = prepare_section(sections[name])
+        token_counts[name] = count_tokens(sections[name])
+    if over_budget:
+        # Shrinking may free budget for the other sections
+        budgets = allocate_budgets(token_counts, available)
+    question = truncate_to_tokens(sections["question"], budgets["question"])
+    supporting_docs = truncate_to_tokens(sections["supporting_docs"], budgets["supporting_docs"])
+    final_output = truncate_to_tokens(sections["final_output"], budgets["final_output"])
+    prompt = render_prompt(question, supporting_docs, final_output)
+    return prompt, count_tokens(prompt)
@@ -0,0 +1,104 @@
+"""Token-bucket admission control in front of the model calls.
+
+Buckets live in the submissions database, so every Streamlit session and
+worker process shares them. Two limits apply:
+
+- per student: a submission that needs a new model call takes a token from
+  the student's bucket, or is rejected with a retry-after; submissions
+  already graded (cached, or an existing job) are served without a token
+- global: job workers take a token before starting each job, so bursts wait
+  in the job queue instead of exceeding the model provider's rate limit; when
+  the queue itself is deeper than `max_queue`, new work is rejected
+
+Limits are read from the `limits` settings (env LIMITS_<KEY>), e.g.
+LIMITS_STUDENT_PER_HOUR=6. A rate of 0 turns that bucket off.
+"""
+import time
+
+from config import get_setting
+from db_utils import init_db, connection
+
+GLOBAL_KEY = "global"
+STUDENT_CAPACITY = 3
+STUDENT_PER_HOUR = 6
+GLOBAL_CAPACITY = 10
+GLOBAL_PER_MINUTE = 60
+MAX_QUEUE = 500
+# Retry-after for a full queue when there is no global rate to estimate its drain time from
+QUEUE_FULL_RETRY = 60.0
+
+
+def try_acquire(key, capacity, refill_per_second, cost=1.0):
+    """Take `cost` tokens from the bucket `key` if it has them.
+
+    Returns (acquired, retry_after_seconds); retry_after is 0 when acquired.
+    """
+    init_db()
+    with connection() as conn:
+        now = time.time()
+        # IMMEDIATE serialises the read-modify-write across processes
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM rate_buckets WHERE key = ?', (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * refill_per_second)
+            acquired = tokens >= cost
+            if acquired:
+                tokens -= cost
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)', (key, tokens, now)
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    if acquired:
+        return True, 0.0
+    return False, (cost - tokens) / refill_per_second if refill_per_second else float("inf")
+
+
+class AdmissionController:
+    """Per-student and global token buckets plus a cap on the job queue depth.
+
+    A per-hour or per-minute rate of 0 disables that bucket.
+    """
+
+    def __init__(self, student_capacity=STUDENT_CAPACITY, student_per_hour=STUDENT_PER_HOUR,
+                 global_capacity=GLOBAL_CAPACITY, global_per_minute=GLOBAL_PER_MINUTE, max_queue=MAX_QUEUE):
+        self.student_capacity = student_capacity
+        self.student_rate = student_per_hour / 3600
+        self.global_capacity = global_capacity
+        self.global_rate = global_per_minute / 60
+        self.max_queue = max_queue
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            student_capacity=float(get_setting("limits", "student_capacity", STUDENT_CAPACITY)),
+            student_per_hour=float(get_setting("limits", "student_per_hour", STUDENT_PER_HOUR)),
+            global_capacity=float(get_setting("limits", "global_capacity", GLOBAL_CAPACITY)),
+            global_per_minute=float(get_setting("limits", "global_per_minute", GLOBAL_PER_MINUTE)),
+            max_queue=int(get_setting("limits", "max_queue", MAX_QUEUE))
+        )
+
+    def admit(self, student_name, already_graded, queued):
+        """Decide whether a student's submission may be queued.
+
+        `already_graded` submissions are always admitted and cost nothing; otherwise
+        `queued` is the current job queue depth. Returns (admitted, retry_after_seconds).
+        """
+        if already_graded:
+            return True, 0.0
+        if self.max_queue is not None and queued >= self.max_queue:
+            if not self.global_rate:
+                return False, QUEUE_FULL_RETRY
+            # Roughly how long the queue takes to drain at the global rate
+            return False, (queued - self.max_queue + 1) / self.global_rate
+        if not self.student_rate:
+            return True, 0.0
+        return try_acquire(f"student:{student_name.strip().lower()}", self.student_capacity, self.student_rate)
+
+    def acquire_global(self):
+        """Take a token for starting one model call. Returns (acquired, retry_after_seconds)."""
+        if not self.global_rate:
+            return True, 0.0
+        return try_acquire(GLOBAL_KEY, self.global_capacity, self.global_rate)
@@ -0,0 +1,348 @@
+"""The submissions database served over HTTP, for app replicas on several hosts.
+
+This is a small stand-in for a real database server, meant for trusted
+networks: it has no TLS and authenticates clients only by a shared secret.
+One process owns the SQLite file and runs statements for its clients:
+
+    STORAGE_DB_TOKEN=<secret> python remote_db.py serve --path submissions.db --port 8090
+
+Replicas set `storage.db_url` (env STORAGE_DB_URL) and the same
+`storage.db_token`, and db_utils hands out a RemoteConnection instead of a
+local sqlite3 connection. A RemoteConnection mirrors the small part of the
+sqlite3 API this app uses (execute, executemany, commit, rollback and `with
+conn:` transactions). Each client opens its own server-side connection, so
+transactions, including `BEGIN IMMEDIATE`, keep their isolation while the
+server serialises writers for every replica.
+
+Every request must carry the token. Statements may only touch the app's own
+tables and may not attach databases, drop objects or change pragmas. A
+statement is never resent once its request has gone out, and a transaction
+whose server connection was lost (server restart, idle expiry) fails instead
+of silently continuing on a new connection.
+"""
+import os
+import hmac
+import json
+import time
+import uuid
+import sqlite3
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Server-side connections idle this long are rolled back and closed
+SESSION_IDLE_SECONDS = 300
+BUSY_TIMEOUT_MS = 30000
+TOKEN_ENV = "STORAGE_DB_TOKEN"
+
+APP_TABLES = {
+    "submissions", "daily_counts", "result_counts", "student_weekly", "evaluation_jobs", "rate_buckets",
+    "sqlite_master", "sqlite_sequence"
+}
+ALLOWED_PRAGMAS = {"table_info"}
+DENIED_ACTIONS = {
+    sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH,
+    sqlite3.SQLITE_DROP_INDEX, sqlite3.SQLITE_DROP_TABLE, sqlite3.SQLITE_DROP_TRIGGER, sqlite3.SQLITE_DROP_VIEW,
+    sqlite3.SQLITE_DROP_TEMP_INDEX, sqlite3.SQLITE_DROP_TEMP_TABLE, sqlite3.SQLITE_DROP_TEMP_TRIGGER,
+    sqlite3.SQLITE_DROP_TEMP_VIEW, sqlite3.SQLITE_DROP_VTABLE,
+    sqlite3.SQLITE_CREATE_TRIGGER, sqlite3.SQLITE_CREATE_TEMP_TRIGGER, sqlite3.SQLITE_CREATE_VIEW,
+    sqlite3.SQLITE_CREATE_TEMP_VIEW, sqlite3.SQLITE_CREATE_VTABLE
+}
+# Actions whose table name is the first argument, or the second
+TABLE_ARG1_ACTIONS = {sqlite3.SQLITE_READ, sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE,
+                      sqlite3.SQLITE_CREATE_TABLE}
+TABLE_ARG2_ACTIONS = {sqlite3.SQLITE_CREATE_INDEX, sqlite3.SQLITE_ALTER_TABLE}
+
+
+class RemoteDatabaseError(sqlite3.DatabaseError):
+    """A statement failed on the server, or the server could not be reached or lost the connection."""
+
+
+class RemoteCursor:
+    def __init__(self, rows, rowcount, lastrowid):
+        self._rows = rows
+        self._index = 0
+        self.rowcount = rowcount
+        self.lastrowid = lastrowid
+
+    def fetchone(self):
+        if self._index >= len(self._rows):
+            return None
+        row = self._rows[self._index]
+        self._index += 1
+        return row
+
+    def fetchall(self):
+        rows = self._rows[self._index:]
+        self._index = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+class RemoteConnection:
+    """sqlite3-style connection backed by a session on a remote_db server.
+
+    Like sqlite3 connections, one instance must not be shared between threads.
+    """
+
+    def __init__(self, url, token, timeout=BUSY_TIMEOUT_MS / 1000 + 30):
+        parts = urlsplit(url)
+        self._host = parts.hostname
+        self._port = parts.port or 80
+        self._base = parts.path.rstrip('/')
+        self._headers = {"Content-Type": "application/json", "Authorization": f"Bearer {token}"}
+        self._timeout = timeout
+        self._http = None
+        self._session = None
+        self._in_transaction = False
+
+    def _post(self, action, payload):
+        body = json.dumps(payload).encode('utf-8')
+        for attempt in range(2):
+            if self._http is None:
+                self._http = http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+            try:
+                self._http.request("POST", f"{self._base}/{action}", body, self._headers)
+            except (OSError, http.client.HTTPException):
+                # Nothing reached the server (e.g. a kept-alive socket it had closed), so one resend is safe
+                self._close_http()
+                if attempt:
+                    raise RemoteDatabaseError("Could not reach the database server")
+                continue
+            try:
+                response = self._http.getresponse()
+                return json.loads(response.read() or b"{}")
+            except (OSError, ValueError, http.client.HTTPException):
+                # The statement may or may not have run, so it must not be sent again
+                self._close_http()
+                raise RemoteDatabaseError("Lost the connection to the database server while it ran a statement")
+
+    def _close_http(self):
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+    def _open(self):
+        data = self._post("open", {})
+        if "error" in data:
+            raise RemoteDatabaseError(data["error"])
+        self._session = data["session"]
+        self._in_transaction = False
+
+    def _call(self, action, payload=None):
+        if self._session is None:
+            self._open()
+        payload = payload or {}
+        data = self._post(action, {"session": self._session, **payload})
+        if data.get("code") == "unknown_session":
+            # The server restarted or expired our connection; it ran nothing for this request
+            in_transaction = self._in_transaction
+            self._session = None
+            self._in_transaction = False
+            if in_transaction:
+                raise RemoteDatabaseError("The database server lost this connection's open transaction")
+            self._open()
+            data = self._post(action, {"session": self._session, **payload})
+        if "in_transaction" in data:
+            self._in_transaction = data["in_transaction"]
+        if "error" in data:
+            raise RemoteDatabaseError(data["error"])
+        return data
+
+    @property
+    def in_transaction(self):
+        return self._in_transaction
+
+    def execute(self, sql, params=()):
+        data = self._call("execute", {"sql": sql, "params": list(params)})
+        return RemoteCursor([tuple(row) for row in data["rows"]], data["rowcount"], data["lastrowid"])
+
+    def executemany(self, sql, seq_of_params):
+        data = self._call("executemany", {"sql": sql, "params": [list(params) for params in seq_of_params]})
+        return RemoteCursor([], data["rowcount"], data["lastrowid"])
+
+    def commit(self):
+        self._call("commit")
+
+    def rollback(self):
+        self._call("rollback")
+
+    def close(self):
+        try:
+            if self._session is not None:
+                self._post("close", {"session": self._session})
+        finally:
+            self._session = None
+            self._close_http()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+
+def _authorize(action, arg1, arg2, db_name, trigger):
+    """sqlite3 authorizer limiting clients to the app's tables and statements."""
+    if action in DENIED_ACTIONS:
+        return sqlite3.SQLITE_DENY
+    if action == sqlite3.SQLITE_PRAGMA:
+        return sqlite3.SQLITE_OK if arg1 in ALLOWED_PRAGMAS else sqlite3.SQLITE_DENY
+    table = arg1 if action in TABLE_ARG1_ACTIONS else arg2 if action in TABLE_ARG2_ACTIONS else None
+    if table is not None and table not in APP_TABLES:
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+
+class SessionStore:
+    """Server-side sqlite3 connections, one per client session."""
+
+    def __init__(self, path, idle_seconds=SESSION_IDLE_SECONDS):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def open(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.set_authorizer(_authorize)
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = {"conn": conn, "lock": threading.Lock(), "used": time.monotonic()}
+        return session_id
+
+    def get(self, session_id):
+        """Return the session, or None if it was never opened, was closed or has expired."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session["used"] = time.monotonic()
+            return session
+
+    def close(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            with session["lock"]:
+                session["conn"].rollback()
+                session["conn"].close()
+
+    def close_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [session_id for session_id, session in self._sessions.items() if session["used"] < cutoff]
+        for session_id in idle:
+            self.close(session_id)
+
+
+def make_db_handler(sessions, token):
+    expected = f"Bearer {token}".encode('utf-8')
+
+    class DatabaseHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+            if not hmac.compare_digest(self.headers.get('Authorization', '').encode('utf-8'), expected):
+                self._send(401, {"error": "unauthorized"})
+                return
+            action = self.path.rstrip('/').rsplit('/', 1)[-1]
+            if action == "open":
+                self._send(200, {"session": sessions.open()})
+                return
+            session_id = request.get("session")
+            if action == "close":
+                sessions.close(session_id)
+                self._send(200, {})
+                return
+            if action not in ("execute", "executemany", "commit", "rollback"):
+                self._send(404, {"error": f"unknown action {action}"})
+                return
+            session = sessions.get(session_id)
+            if session is None:
+                self._send(409, {"error": "unknown session", "code": "unknown_session"})
+                return
+            with session["lock"]:
+                conn = session["conn"]
+                try:
+                    if action == "execute":
+                        cursor = conn.execute(request["sql"], request.get("params", []))
+                        result = {"rows": cursor.fetchall(), "rowcount": cursor.rowcount, "lastrowid": cursor.lastrowid}
+                    elif action == "executemany":
+                        cursor = conn.executemany(request["sql"], request.get("params", []))
+                        result = {"rowcount": cursor.rowcount, "lastrowid": cursor.lastrowid}
+                    elif action == "commit":
+                        conn.commit()
+                        result = {}
+                    else:
+                        conn.rollback()
+                        result = {}
+                except sqlite3.Error as e:
+                    result = {"error": str(e)}
+                result["in_transaction"] = conn.in_transaction
+            self._send(200, result)
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return DatabaseHandler
+
+
+def serve(host, port, path, token):
+    sessions = SessionStore(path)
+    server = ThreadingHTTPServer((host, port), make_db_handler(sessions, token))
+    server.daemon_threads = True
+
+    def reap():
+        while True:
+            time.sleep(SESSION_IDLE_SECONDS / 4)
+            sessions.close_idle()
+
+    threading.Thread(target=reap, name="session-reaper", daemon=True).start()
+    print(f"Serving {path} on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=f"Serve the submissions database to app replicas (trusted networks only; "
+                    f"clients must send the shared secret in ${TOKEN_ENV})"
+    )
+    parser.add_argument("command", choices=["serve"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--path", default="submissions.db")
+    args = parser.parse_args()
+    # Read from the environment rather than a flag, so the secret does not show up in process listings
+    token = os.environ.get(TOKEN_ENV)
+    if not token:
+        parser.error(f"set {TOKEN_ENV} to the shared secret replicas will use")
+    serve(args.host, args.port, args.path, token)
+
+
+if __name__ == "__main__":
+    main()
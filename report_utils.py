@@ -0,0 +1,159 @@
+"""PDF report rendering with ReportLab.
+
+Imported on first use by utils.render_pdf_report, so the student page and the
+grading path do not pay for loading ReportLab.
+"""
+import io
+import re
+import copy
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.units import inch
+
+from feedback_utils import parse_feedback
+
+# Report styles and fixed sections are built once; stories get shallow copies of the flowables
+REPORT_STYLES = getSampleStyleSheet()
+REPORT_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=REPORT_STYLES['Heading1'],
+    fontSize=24,
+    spaceAfter=20,
+    alignment=TA_CENTER
+)
+SCORE_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+    ('TEXTCOLOR', (0,0), (-1,0), colors.black),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0,0), (-1,0), 6),
+    ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
+    ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+    ('VALIGN', (0,0), (-1,-1), 'TOP'),
+])
+REPORT_TITLE = [Paragraph("SkillShareVerify™ Report", REPORT_TITLE_STYLE)]
+REPORT_TRAINER_SECTION = [
+    Paragraph("<b>Trainer Information</b>", REPORT_STYLES['Heading2']),
+    Paragraph("<b>Name:</b> Rohit Krishnan", REPORT_STYLES['Normal']),
+    Paragraph("<b>Role:</b> Senior Trainer of Data Science & AI", REPORT_STYLES['Normal']),
+    Spacer(1, 20)
+]
+REPORT_FOOTER = [
+    Spacer(1, 50),
+    Paragraph("Generated via SkillShareVerify™", REPORT_STYLES['Normal']),
+    Paragraph("Created by Rohit Krishnan", REPORT_STYLES['Normal']),
+    Paragraph("Contact Information:", REPORT_STYLES['Normal']),
+    Paragraph("📧 Email: rohitkrishnanm@gmail.com", REPORT_STYLES['Normal']),
+    Paragraph("🌐 Website: https://rohitkrishnan.co.in", REPORT_STYLES['Normal']),
+    Paragraph("🔗 LinkedIn: https://www.linkedin.com/in/rohit-krishnan-m", REPORT_STYLES['Normal']),
+    Paragraph("📸 Instagram: https://www.instagram.com/prof_rohit_/", REPORT_STYLES['Normal'])
+]
+
+
+def _copy_flowables(flowables):
+    return [copy.copy(flowable) for flowable in flowables]
+
+def clean_bullets(text):
+    # Remove markdown and extra symbols, split on dash, and clean
+    items = [re.sub(r'[\-*•]+', '', s).replace('**', '').strip() for s in text.split(' - ') if s.strip()]
+    return [item for item in items if item]
+
+def clean_markdown(text):
+    # Remove markdown symbols and extra whitespace
+    return re.sub(r'[\-*•]+', '', text).replace('**', '').replace('###', '').strip()
+
+def parse_assignment_summary(summary):
+    # Try to extract known fields and return as (label, value) pairs
+    fields = [
+        ("Assignment Title", r"Assignment\s*:?\s*([^■\n]+)", None),
+        ("Institution", r"Institution\s*:?\s*([^■\n]+)", None),
+        ("Trainer", r"Trainer\s*:?\s*([^■\n]+)", None),
+        ("Due Date", r"Due Date\s*:?\s*([^■\n]+)", None),
+        ("Submission Format", r"Submission Format\s*:?\s*([^■\n]+)", None),
+    ]
+    results = []
+    for label, pattern, _ in fields:
+        match = re.search(pattern, summary, re.IGNORECASE)
+        if match:
+            results.append((label, match.group(1).strip()))
+    return results
+
+def build_pdf_report(student_name, institution, question_summary, feedback, score):
+    """Lay out and build the report, returning the PDF bytes."""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = REPORT_STYLES
+    story = []
+
+    # Title
+    story += _copy_flowables(REPORT_TITLE)
+
+    # Header with timestamp
+    story.append(Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
+    story.append(Spacer(1, 20))
+
+    # Student Information
+    story.append(Paragraph("<b>Student Information</b>", styles['Heading2']))
+    story.append(Paragraph(f"<b>Name:</b> {student_name}", styles['Normal']))
+    story.append(Paragraph(f"<b>Institution:</b> {institution}", styles['Normal']))
+    story.append(Spacer(1, 10))
+
+    # Trainer Information
+    story += _copy_flowables(REPORT_TRAINER_SECTION)
+
+    # Feedback (structured)
+    story.append(Paragraph("<b>Feedback</b>", styles['Heading2']))
+    if isinstance(feedback, str):
+        feedback = parse_feedback(feedback)
+
+    # Strengths as paragraph
+    strengths_text = clean_markdown(feedback.strengths).replace(' .', '.').replace('..', '.').strip()
+    if strengths_text:
+        story.append(Paragraph(f"<b>Strengths:</b> {strengths_text}", styles['BodyText']))
+        story.append(Spacer(1, 6))
+    # Areas for Improvement as paragraph
+    improvements_text = clean_markdown(feedback.improvements).replace(' .', '.').replace('..', '.').strip()
+    if improvements_text:
+        story.append(Paragraph(f"<b>Areas for Improvement:</b> {improvements_text}", styles['BodyText']))
+        story.append(Spacer(1, 6))
+    # Score Breakdown Table with details
+    if feedback.criteria:
+        story.append(Paragraph("<b>Score Breakdown:</b>", styles['BodyText']))
+        table_data = [["Criteria", "Score & Explanation"]]
+        for criterion in feedback.criteria:
+            if criterion.explanation:
+                # Use Paragraph for explanation to allow wrapping
+                detail = Paragraph(f"{criterion.display_score} – {criterion.explanation}", styles['BodyText'])
+            else:
+                detail = criterion.display_score
+            table_data.append([criterion.name, detail])
+        col_widths = [2.5*inch, 3.5*inch]
+        table = Table(table_data, colWidths=col_widths, hAlign='LEFT')
+        table.setStyle(SCORE_TABLE_STYLE)
+        story.append(table)
+        story.append(Spacer(1, 6))
+    # Total Score
+    if feedback.total is not None:
+        story.append(Paragraph(f"<b>Total Score:</b> {feedback.total:g}/10", styles['BodyText']))
+        story.append(Spacer(1, 6))
+    # Final Verdict as paragraph
+    verdict_text = clean_markdown(feedback.verdict).replace(' .', '.').replace('..', '.').strip()
+    if verdict_text:
+        story.append(Spacer(1, 10))
+        story.append(Paragraph(f"<b>Final Verdict:</b> {verdict_text}", styles['BodyText']))
+        story.append(Spacer(1, 10))
+
+    # Score
+    story.append(Paragraph("<b>Score</b>", styles['Heading2']))
+    story.append(Paragraph(f"Score: {score}/10", styles['Normal']))
+
+    # Footer with contact details
+    story += _copy_flowables(REPORT_FOOTER)
+
+    doc.build(story)
+    return buffer.getvalue()
@@ -0,0 +1,161 @@
+import re
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+
+MERSENNE_PRIME = (1 << 31) - 1
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+COMMENT_PATTERN = re.compile(r"#.*$", re.MULTILINE)
+
+
+def shingles(text, size=5):
+    """Lower-cased token shingles with `#` comments removed."""
+    tokens = TOKEN_PATTERN.findall(COMMENT_PATTERN.sub("", text or "").lower())
+    if len(tokens) < size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class SimilarityIndex:
+    """MinHash signatures with LSH banding, stored in SQLite, to find near-duplicate submissions.
+
+    Submissions are grouped by a question key so only answers to the same
+    question are compared. Pairs from different students above a threshold can
+    be flagged for trainer review.
+    """
+
+    def __init__(self, path, num_perm=64, bands=16, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        rng = random.Random(seed)
+        self._a = np.array([rng.randrange(1, MERSENNE_PRIME) for _ in range(num_perm)], dtype=np.uint64)
+        self._b = np.array([rng.randrange(0, MERSENNE_PRIME) for _ in range(num_perm)], dtype=np.uint64)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS entries (
+                cache_key TEXT,
+                student_name TEXT,
+                question_key TEXT,
+                signature BLOB,
+                PRIMARY KEY (cache_key, student_name)
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                question_key TEXT,
+                band INTEGER,
+                bucket TEXT,
+                cache_key TEXT,
+                UNIQUE (question_key, band, bucket, cache_key)
+            );
+            CREATE TABLE IF NOT EXISTS flagged_pairs (
+                student_name TEXT,
+                cache_key TEXT,
+                similar_student TEXT,
+                similar_cache_key TEXT,
+                similarity REAL,
+                created REAL,
+                UNIQUE (cache_key, student_name, similar_cache_key, similar_student)
+            );
+            CREATE INDEX IF NOT EXISTS idx_bands_lookup ON bands (question_key, band, bucket);
+        ''')
+        self._conn.commit()
+
+    def signature(self, text):
+        """Return the MinHash signature of text, or None if it has no tokens."""
+        features = shingles(text)
+        if not features:
+            return None
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(f.encode('utf-8'), digest_size=4).digest(), 'little') for f in features],
+            dtype=np.uint64
+        ) % MERSENNE_PRIME
+        # a * h stays below 2**62, so the permutation can't overflow uint64
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    @staticmethod
+    def similarity(signature_a, signature_b):
+        """Estimated Jaccard similarity of two signatures."""
+        return float(np.mean(signature_a == signature_b))
+
+    def _buckets(self, signature):
+        for band in range(self.bands):
+            rows = signature[band * self.rows_per_band:(band + 1) * self.rows_per_band]
+            yield band, hashlib.sha1(rows.tobytes()).hexdigest()
+
+    def add(self, question_key, cache_key, student_name, signature):
+        if signature is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                (cache_key, student_name or "", question_key, signature.tobytes())
+            )
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO bands VALUES (?, ?, ?, ?)',
+                [(question_key, band, bucket, cache_key) for band, bucket in self._buckets(signature)]
+            )
+            self._conn.commit()
+
+    def find_similar(self, question_key, signature, threshold):
+        """Return [(cache_key, student_name, similarity)] at or above threshold, most similar first."""
+        if signature is None:
+            return []
+        with self._lock:
+            candidates = set()
+            for band, bucket in self._buckets(signature):
+                candidates.update(key for (key,) in self._conn.execute(
+                    'SELECT cache_key FROM bands WHERE question_key = ? AND band = ? AND bucket = ?',
+                    (question_key, band, bucket)
+                ))
+            matches = []
+            for cache_key in candidates:
+                for student_name, stored in self._conn.execute(
+                    'SELECT student_name, signature FROM entries WHERE cache_key = ?', (cache_key,)
+                ):
+                    score = self.similarity(signature, np.frombuffer(stored, dtype=np.uint32))
+                    if score >= threshold:
+                        matches.append((cache_key, student_name, score))
+        return sorted(matches, key=lambda match: match[2], reverse=True)
+
+    def record_duplicate(self, cache_key, student_name):
+        """Register an exact resubmission of cache_key by student_name, flagging other students."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT student_name, question_key, signature FROM entries WHERE cache_key = ?', (cache_key,)
+            ).fetchall()
+        if not rows:
+            return
+        _, question_key, signature = rows[0]
+        self.add(question_key, cache_key, student_name, np.frombuffer(signature, dtype=np.uint32))
+        self.flag(cache_key, student_name, [(cache_key, other, 1.0) for other, _, _ in rows])
+
+    def flag(self, cache_key, student_name, matches):
+        """Record matches from other students for trainer review."""
+        rows = [
+            (student_name or "", cache_key, other_student, other_key, score, time.time())
+            for other_key, other_student, score in matches
+            if other_student != (student_name or "")
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany('INSERT OR IGNORE INTO flagged_pairs VALUES (?, ?, ?, ?, ?, ?)', rows)
+            self._conn.commit()
+
+    def flagged_pairs(self, limit=100):
+        """Most recent (student_name, similar_student, similarity, created) flags."""
+        with self._lock:
+            return self._conn.execute('''
+                SELECT student_name, similar_student, similarity, created
+                FROM flagged_pairs
+                ORDER BY created DESC
+                LIMIT ?
+            ''', (limit,)).fetchall()
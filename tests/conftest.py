@@ -0,0 +1,16 @@
+import os
+import sys
+import tempfile
+
+# The app's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Storage settings are read on import; point them at a scratch directory so tests never touch real data
+_storage = tempfile.mkdtemp(prefix="skillshare-tests-")
+os.environ.update({
+    "STORAGE_CACHE_DIR": os.path.join(_storage, "cache"),
+    "STORAGE_SHARED_CACHE_DIR": "",
+    "STORAGE_DB_PATH": os.path.join(_storage, "submissions.db"),
+    "STORAGE_DB_URL": "",
+    "STORAGE_RECORDS_DIR": os.path.join(_storage, "submission_records")
+})
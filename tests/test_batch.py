@@ -0,0 +1,41 @@
+import uuid
+
+from batch import report_filename, run_batch
+from eval_engine import EvaluationEngine
+from llm_backends import stub_reply
+
+
+class FlakyError(Exception):
+    """Stands in for the OpenAI rate-limit and timeout errors the engine retries."""
+
+
+class FlakyClient:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def complete(self, prompt, timeout=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise FlakyError("try again")
+        return stub_reply(prompt)
+
+
+def test_batch_gradings_are_retried_by_the_engine(tmp_path):
+    answer = tmp_path / "answer.py"
+    answer.write_text(f"print('{uuid.uuid4().hex}')\n")
+    jobs = [{"student": "amy", "question": "Print a greeting", "supporting_docs": [], "final_output": str(answer)}]
+    client = FlakyClient(failures=2)
+    engine = EvaluationEngine(llm_client=client, retry_on=(FlakyError,), backoff=0)
+    try:
+        summary = run_batch(jobs, workers=1, progress_path=str(tmp_path / "progress.jsonl"), engine=engine)
+    finally:
+        engine.shutdown()
+    assert (summary["graded"], summary["failed"]) == (1, 0)
+    assert client.calls == 3
+
+
+def test_report_filenames_keep_student_names_inside_the_folder():
+    assert report_filename("Amy Lee", "0123456789abcdef") == "Amy_Lee_0123456789ab.pdf"
+    assert report_filename("../../etc/passwd", "0123456789abcdef") == "etc_passwd_0123456789ab.pdf"
+    assert report_filename("..", "0123456789abcdef") == "student_0123456789ab.pdf"
@@ -0,0 +1,63 @@
+import json
+
+from cache_utils import SQLiteCache, DirectoryCache, migrate_legacy_cache
+
+
+def write_legacy(directory, count):
+    keys = [f"{index:064x}" for index in range(count)]
+    for key in keys:
+        (directory / f"{key}.json").write_text(json.dumps({"result": key}))
+    return keys
+
+
+class CountingCache(SQLiteCache):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    def set_many(self, items):
+        items = list(items)
+        self.batches.append(len(items))
+        super().set_many(items)
+
+
+def test_legacy_files_are_migrated_in_batches(tmp_path):
+    legacy = tmp_path / "legacy"
+    legacy.mkdir()
+    keys = write_legacy(legacy, 25)
+    (legacy / "notes.json").write_text("{}")
+    cache = CountingCache(str(tmp_path / "cache.db"))
+    assert migrate_legacy_cache(cache, str(legacy), batch_size=10) == 25
+    assert sorted(cache.batches) == [5, 10, 10]
+    assert cache.get(keys[0]) == {"result": keys[0]}
+    assert [path.name for path in legacy.iterdir()] == ["notes.json"]
+
+
+def test_migration_evicts_down_to_the_bounds(tmp_path):
+    legacy = tmp_path / "legacy"
+    legacy.mkdir()
+    write_legacy(legacy, 30)
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_entries=20)
+    migrate_legacy_cache(cache, str(legacy))
+    assert cache.stats()["entries"] == 20
+
+
+def test_directory_cache_set_many(tmp_path):
+    cache = DirectoryCache(str(tmp_path / "shared"), max_entries=5, sweep_every=50)
+    cache.set_many((f"{index:064x}", index) for index in range(60))
+    assert cache.stats()["entries"] == 5
+
+
+def test_hits_touch_the_access_time_only_when_stale(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), touch_interval=60)
+    cache.set("a", 1)
+
+    def accessed():
+        return cache._conn.execute("SELECT accessed FROM entries WHERE key = 'a'").fetchone()[0]
+
+    written = accessed()
+    assert cache.get("a") == 1
+    assert accessed() == written
+    cache._conn.execute("UPDATE entries SET accessed = accessed - 120")
+    cache.get("a")
+    assert accessed() >= written
@@ -0,0 +1,18 @@
+import pytest
+
+from config import get_bool_setting
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("true", True), ("True", True), (" yes ", True), ("1", True),
+    ("false", False), ("0", False), ("no", False), ("", False)
+])
+def test_bool_setting_from_environment(monkeypatch, value, expected):
+    monkeypatch.setenv("STORAGE_GIT_SYNC", value)
+    assert get_bool_setting("storage", "git_sync", True) is expected
+
+
+def test_bool_setting_default(monkeypatch):
+    monkeypatch.delenv("STORAGE_GIT_SYNC", raising=False)
+    assert get_bool_setting("storage", "git_sync", True) is True
+    assert get_bool_setting("storage", "git_sync") is False
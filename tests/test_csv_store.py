@@ -0,0 +1,42 @@
+import csv
+
+from csv_store import CsvJournalStore
+
+FIELDS = ["ID", "Student Name", "Score"]
+
+
+def raw_ids(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [row["ID"] for row in csv.DictReader(f)]
+
+
+def test_deletes_are_hidden_until_compaction_rewrites_the_file(tmp_path):
+    path = str(tmp_path / "submissions.csv")
+    store = CsvJournalStore(path, FIELDS)
+    for i in range(1, 4):
+        store.append({"ID": i, "Student Name": f"student{i}", "Score": 7})
+    store.delete(2)
+    assert [row["ID"] for row in store.rows()] == ["1", "3"]
+    assert raw_ids(path) == ["1", "2", "3"]
+    store.compact()
+    assert raw_ids(path) == ["1", "3"]
+    assert not (tmp_path / "submissions.csv.deleted").exists()
+    # Appends keep working on the rewritten file
+    store.append({"ID": 4, "Student Name": "student4", "Score": 9})
+    assert raw_ids(path) == ["1", "3", "4"]
+
+
+def test_compacts_after_enough_tombstones_from_any_process(tmp_path):
+    path = str(tmp_path / "submissions.csv")
+    first = CsvJournalStore(path, FIELDS, compact_after=3)
+    second = CsvJournalStore(path, FIELDS, compact_after=3)
+    for i in range(1, 6):
+        first.append({"ID": i, "Student Name": f"student{i}", "Score": 7})
+    first.delete(1)
+    first.delete(2)
+    assert raw_ids(path) == ["1", "2", "3", "4", "5"]
+    # The second store counts the first one's tombstones too
+    second.delete(3)
+    assert raw_ids(path) == ["4", "5"]
+    first.append({"ID": 6, "Student Name": "student6", "Score": 7})
+    assert [row["ID"] for row in second.rows()] == ["4", "5", "6"]
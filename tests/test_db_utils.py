@@ -0,0 +1,92 @@
+import pytest
+
+from db_utils import (
+    init_db,
+    connection,
+    add_submission,
+    add_submissions,
+    delete_submission,
+    rebuild_aggregates,
+    check_aggregates,
+    get_all_submissions,
+    get_daily_counts,
+    get_weekly_leaderboard,
+    iter_submissions,
+    query_submissions
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_submissions():
+    init_db()
+    with connection() as conn, conn:
+        conn.execute('DELETE FROM submissions')
+    rebuild_aggregates()
+
+
+def submission(timestamp, student, score):
+    result = "✅ Pass" if score >= 8 else "❌ Rework"
+    return timestamp, student, '', "Sort a list...", score, result
+
+
+def ids_by_student():
+    return {row[2]: row[0] for row in get_all_submissions()}
+
+
+def test_aggregates_follow_inserts_and_deletes():
+    add_submissions([
+        submission("2024-03-04 09:00:00", "amy", 9),
+        submission("2024-03-05 10:00:00", "bob", 6),
+        submission("2024-03-11 11:00:00", "cat", 8)
+    ])
+    add_submission(*submission("2024-03-05 12:00:00", "amy", 5))
+    assert check_aggregates() == []
+    assert get_weekly_leaderboard("2024-03-04") == [("amy", 9, 7, 2), ("bob", 6, 6, 1)]
+
+    # Deleting amy's best score recomputes her week; deleting cat's only row empties that day
+    best = next(row[0] for row in get_all_submissions() if row[2] == "amy" and row[5] == 9)
+    delete_submission(best)
+    delete_submission(ids_by_student()["cat"])
+    assert check_aggregates() == []
+    assert get_weekly_leaderboard("2024-03-04") == [("bob", 6, 6, 1), ("amy", 5, 5, 1)]
+    assert get_daily_counts() == [("2024-03-05", 2)]
+
+
+def test_deleting_a_missing_submission_changes_nothing():
+    add_submission(*submission("2024-03-04 09:00:00", "amy", 9))
+    delete_submission(-1)
+    assert check_aggregates() == []
+    assert len(get_all_submissions()) == 1
+
+
+def test_keyset_pages_cover_every_row_once():
+    # Repeated scores, so pages must break ties on id
+    add_submissions([submission(f"2024-03-04 09:00:{i:02d}", f"student{i}", i % 3) for i in range(10)])
+    expected = [row[0] for row in query_submissions(order_by="score", limit=100)[0]]
+    seen = []
+    cursor = None
+    while True:
+        rows, cursor = query_submissions(order_by="score", after=cursor, limit=3)
+        seen.extend(row[0] for row in rows)
+        if cursor is None:
+            break
+    assert seen == expected
+    assert len(set(seen)) == 10
+
+
+def test_iter_submissions_yields_every_row_in_chunks():
+    add_submissions([submission("2024-03-04 09:00:00", f"student{i}", 7) for i in range(7)])
+    chunks = list(iter_submissions(chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    ids = [row[0] for chunk in chunks for row in chunk]
+    assert ids == sorted(ids)
+
+
+def test_pooled_connections_are_reused_and_returned_clean():
+    with connection() as first:
+        first.execute('BEGIN')
+        first.execute('INSERT INTO submissions (student_name) VALUES (?)', ("left open",))
+    with connection() as second:
+        assert second is first
+        assert not second.in_transaction
+        assert second.execute('SELECT COUNT(*) FROM submissions').fetchone()[0] == 0
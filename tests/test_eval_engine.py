@@ -0,0 +1,177 @@
+import uuid
+import threading
+
+import pytest
+
+from eval_engine import EvaluationEngine, EvaluationProgress
+from llm_backends import stub_reply
+from utils import evaluation_cache, get_cache_key
+
+
+class FlakyError(Exception):
+    """Stands in for the OpenAI rate-limit and timeout errors the engine retries."""
+
+
+class LocalClient:
+    """LLM client answering with the stub backend's reply after `failures` FlakyErrors."""
+
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def complete(self, prompt, timeout=None):
+        with self._lock:
+            self.calls += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            fail = self.calls <= self.failures
+        try:
+            threading.Event().wait(self.delay)
+            if fail:
+                raise FlakyError("try again")
+            return stub_reply(prompt)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+class OpenAIClient(LocalClient):
+    cache_namespace = "openai:test-model"
+
+
+class StreamingClient(LocalClient):
+    def stream(self, prompt, timeout=None):
+        reply = self.complete(prompt, timeout)
+        for start in range(0, len(reply), 10):
+            yield reply[start:start + 10]
+
+
+def make_engine(client, **kwargs):
+    return EvaluationEngine(llm_client=client, retry_on=(FlakyError,), backoff=0, **kwargs)
+
+
+def submission():
+    """A question and answer no other test has graded, so the evaluation cache misses."""
+    return f"Write a function that reverses a list ({uuid.uuid4().hex})", "", "def reverse(xs):\n    return xs[::-1]\n"
+
+
+def test_grades_with_the_client():
+    client = LocalClient()
+    engine = make_engine(client)
+    try:
+        text, feedback = engine.submit(*submission()).result(timeout=10)
+        assert text
+        assert feedback.total == sum(criterion.score for criterion in feedback.criteria)
+        assert [criterion.name for criterion in feedback.criteria] == [
+            "Code Quality", "Problem-Solving", "Documentation", "Best Practices"
+        ]
+        assert client.calls == 1
+    finally:
+        engine.shutdown()
+
+
+def test_identical_work_is_served_from_the_cache():
+    client = LocalClient()
+    engine = make_engine(client)
+    work = submission()
+    try:
+        first = engine.submit(*work).result(timeout=10)
+        second = engine.submit(*work, student_name="bob").result(timeout=10)
+        assert second[0] == first[0]
+        assert client.calls == 1
+    finally:
+        engine.shutdown()
+
+
+def test_retryable_errors_are_retried_and_reported():
+    client = LocalClient(failures=2)
+    engine = make_engine(client, max_retries=3)
+    progress = EvaluationProgress()
+    try:
+        _, feedback = engine.submit(*submission(), progress=progress).result(timeout=10)
+        assert feedback.total is not None
+        assert client.calls == 3
+        stage, _, attempt = progress.snapshot()
+        assert stage == "parse"
+        assert attempt == 2
+    finally:
+        engine.shutdown()
+
+
+def test_gives_up_after_max_retries():
+    client = LocalClient(failures=10)
+    engine = make_engine(client, max_retries=2)
+    try:
+        with pytest.raises(FlakyError):
+            engine.submit(*submission()).result(timeout=10)
+        assert client.calls == 3
+        assert engine.pending() == 0
+    finally:
+        engine.shutdown()
+
+
+def test_runs_at_most_max_workers_jobs_at_once():
+    client = LocalClient(delay=0.05)
+    engine = make_engine(client, max_workers=2)
+    try:
+        futures = [engine.submit(*submission()) for _ in range(6)]
+        for future in futures:
+            future.result(timeout=10)
+        assert client.calls == 6
+        assert client.max_running == 2
+        assert engine.pending() == 0
+    finally:
+        engine.shutdown()
+
+
+def test_progress_follows_the_streamed_reply():
+    client = StreamingClient()
+    engine = make_engine(client)
+    progress = EvaluationProgress()
+    try:
+        engine.submit(*submission(), progress=progress).result(timeout=10)
+        stage, text, attempt = progress.snapshot()
+        assert stage == "parse"
+        # Updates are throttled, so the snapshot holds at least the first streamed chunk
+        assert text.startswith('{"')
+        assert attempt == 0
+    finally:
+        engine.shutdown()
+
+
+def test_gradings_are_cached_per_backend():
+    stub, real = LocalClient(), OpenAIClient()
+    work = submission()
+    engine = make_engine(stub)
+    try:
+        engine.submit(*work).result(timeout=10)
+    finally:
+        engine.shutdown()
+    engine = make_engine(real)
+    try:
+        engine.submit(*work).result(timeout=10)
+        engine.submit(*work).result(timeout=10)
+    finally:
+        engine.shutdown()
+    assert (stub.calls, real.calls) == (1, 1)
+
+
+def test_legacy_entries_are_served_only_to_openai():
+    work = submission()
+    # An entry from before keys named the backend, stored under the content key
+    evaluation_cache.set(get_cache_key(*work), {"result": "legacy feedback\nScore: 7/10"})
+    results = {}
+    stub, real = LocalClient(), OpenAIClient()
+    for client in (stub, real):
+        engine = make_engine(client)
+        try:
+            results[client] = engine.submit(*work).result(timeout=10)[0]
+        finally:
+            engine.shutdown()
+    assert results[real] == "legacy feedback\nScore: 7/10"
+    assert results[stub] != results[real]
+    assert (stub.calls, real.calls) == (1, 0)
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from feedback_utils import parse_feedback, parse_feedback_json
+
+
+def reply(**fields):
+    return json.dumps({
+        "strengths": "Clear code.",
+        "areas_for_improvement": "Add tests.",
+        "score_breakdown": [{"criterion": "Code Quality", "score": 4, "out_of": 5, "explanation": "Tidy."}],
+        "total_score": 8,
+        "final_verdict": "Good work.",
+        **fields
+    })
+
+
+@pytest.mark.parametrize("breakdown", [None, "4/5", 3, {"criterion": "Code Quality"}])
+def test_malformed_score_breakdown_is_ignored(breakdown):
+    feedback = parse_feedback_json(reply(score_breakdown=breakdown))
+    assert feedback.criteria == []
+    assert feedback.total == 8
+
+
+@pytest.mark.parametrize("total, expected", [(8, 8.0), (7.5, 7.5), ("8", 8.0), ("8/10", 8.0), (" 6.5 out of 10", 6.5),
+                                             ("n/a", None), (None, None), (True, None)])
+def test_total_score_takes_the_leading_number(total, expected):
+    assert parse_feedback_json(reply(total_score=total)).total == expected
+
+
+def test_criterion_scores_accept_strings():
+    feedback = parse_feedback_json(reply(score_breakdown=[{"criterion": "Documentation", "score": "1.5/2", "out_of": "2"}]))
+    assert (feedback.criteria[0].score, feedback.criteria[0].out_of) == (1.5, 2.0)
+
+
+def test_text_replies_fall_back_to_the_legacy_parser():
+    feedback = parse_feedback("STRENGTHS: Clear code.\nTOTAL SCORE: 7/10\nFINAL VERDICT: Pass")
+    assert (feedback.strengths, feedback.total, feedback.verdict) == ("Clear code.", 7.0, "Pass")
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+git = pytest.importorskip("git")
+
+from git_sync import GitSyncWorker
+
+
+@pytest.fixture
+def repos(tmp_path):
+    """A working clone with one commit and a local bare repository as its origin."""
+    remote = git.Repo.init(tmp_path / "remote.git", bare=True)
+    work = git.Repo.init(tmp_path / "work")
+    with work.config_writer() as config:
+        config.set_value("user", "name", "Test")
+        config.set_value("user", "email", "test@example.com")
+    records = tmp_path / "work" / "records"
+    records.mkdir()
+    (records / "submissions.csv").write_text("ID,Student\n")
+    work.git.add("-A")
+    work.index.commit("Initial records")
+    work.create_remote("origin", str(tmp_path / "remote.git"))
+    work.git.push("origin", f"HEAD:refs/heads/{work.active_branch.name}")
+    return work, remote, records
+
+
+def write_row(records, row):
+    with open(records / "submissions.csv", "a") as f:
+        f.write(row + "\n")
+
+
+def test_changes_in_one_window_become_one_pushed_commit(repos):
+    work, remote, records = repos
+    worker = GitSyncWorker(work.working_dir, ["records"], debounce=60)
+    try:
+        for student in ("amy", "bob", "cat"):
+            write_row(records, f"1,{student}")
+            worker.notify(f"Add submission from {student}")
+        assert worker.status()["pending"] == 3
+        assert worker.flush(timeout=30)
+    finally:
+        worker.stop()
+
+    status = worker.status()
+    assert status["pending"] == 0
+    assert status["last_error"] is None
+    assert not status["push_pending"]
+    pushed = remote.commit(work.active_branch.name)
+    assert pushed.hexsha == status["last_commit"]
+    assert pushed.message.startswith("Sync 3 submission record changes")
+    assert len(list(remote.iter_commits(work.active_branch.name))) == 2
+
+
+def test_failed_push_is_reported_and_retried(repos, tmp_path):
+    work, remote, records = repos
+    missing = str(tmp_path / "missing.git")
+    worker = GitSyncWorker(
+        work.working_dir, ["records"], remote_url=missing, debounce=0, max_retries=0, retry_interval=0.1
+    )
+    try:
+        write_row(records, "1,amy")
+        worker.notify("Add submission from amy")
+        assert worker.flush(timeout=30)
+        status = worker.status()
+        assert status["push_pending"]
+        assert status["last_error"] and missing not in status["last_error"]
+
+        # Once the remote exists, the pending push goes through without another change
+        git.Repo.init(missing, bare=True)
+        deadline = time.monotonic() + 30
+        while worker.status()["push_pending"] and time.monotonic() < deadline:
+            time.sleep(0.1)
+    finally:
+        worker.stop()
+    assert worker.status()["last_error"] is None
+    assert git.Repo(missing).commit(work.active_branch.name).hexsha == worker.status()["last_commit"]
+
+
+def test_lock_and_temp_files_are_not_committed(repos):
+    work, remote, records = repos
+    (records / "submissions.csv.lock").write_text("")
+    (records / "submissions.csv.1234.tmp").write_text("partial")
+    worker = GitSyncWorker(work.working_dir, ["records"], debounce=0)
+    try:
+        write_row(records, "1,amy")
+        worker.notify("Add submission from amy")
+        assert worker.flush(timeout=30)
+    finally:
+        worker.stop()
+    pushed = remote.commit(work.active_branch.name)
+    assert sorted(blob.path for blob in pushed.tree.traverse() if blob.type == "blob") == ["records/submissions.csv"]
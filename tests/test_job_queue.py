@@ -0,0 +1,107 @@
+import uuid
+import threading
+
+import pytest
+
+import job_queue
+from db_utils import init_db, connection
+from eval_engine import EvaluationEngine
+from llm_backends import stub_reply
+
+
+class CountingClient:
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, prompt, timeout=None):
+        self.calls += 1
+        return stub_reply(prompt)
+
+
+class EmptyBucket:
+    """AdmissionController stand-in whose global bucket never has a token."""
+
+    def __init__(self):
+        self.requests = 0
+
+    def acquire_global(self):
+        self.requests += 1
+        return False, 60.0
+
+
+@pytest.fixture(autouse=True)
+def empty_queue():
+    init_db()
+    with connection() as conn, conn:
+        conn.execute('DELETE FROM evaluation_jobs')
+
+
+def work():
+    return f"Sort a list of numbers ({uuid.uuid4().hex})", "", "print(sorted(numbers))"
+
+
+def job_state(job_id):
+    with connection() as conn:
+        return conn.execute(
+            'SELECT state, attempts FROM evaluation_jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+
+
+def test_cached_jobs_start_without_a_global_token():
+    client = CountingClient()
+    engine = EvaluationEngine(max_workers=2, llm_client=client, retry_on=(RuntimeError,))
+    cached_work = work()
+    engine.submit(*cached_work).result(timeout=10)
+    cached_id, _ = job_queue.enqueue_job(*cached_work, "amy")
+    new_id, _ = job_queue.enqueue_job(*work(), "bob")
+    bucket = EmptyBucket()
+    worker = job_queue.JobWorker(engine, capacity=2, admission=bucket)
+    try:
+        assert worker._claim_available()
+    finally:
+        engine.shutdown()
+    assert job_state(cached_id) == (job_queue.DONE, 1)
+    # The uncached job needed a token, found none and went back to the queue uncounted
+    assert job_state(new_id) == (job_queue.QUEUED, 0)
+    assert bucket.requests == 1
+    assert client.calls == 1
+
+
+def claim_all(worker, claimed):
+    while True:
+        job = job_queue.claim_job(worker)
+        if job is None:
+            return
+        claimed[worker].append(job[0])
+
+
+def test_two_workers_never_claim_the_same_job():
+    job_ids = [job_queue.enqueue_job(*work(), f"student{i}")[0] for i in range(20)]
+    claimed = {"a": [], "b": []}
+    threads = [threading.Thread(target=claim_all, args=(worker, claimed)) for worker in claimed]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert sorted(claimed["a"] + claimed["b"]) == sorted(job_ids)
+    assert not set(claimed["a"]) & set(claimed["b"])
+
+
+def go_quiet(job_id):
+    with connection() as conn, conn:
+        conn.execute('UPDATE evaluation_jobs SET heartbeat = heartbeat - 3600 WHERE id = ?', (job_id,))
+
+
+def test_stale_jobs_pass_to_another_worker_then_fail():
+    job_id, _ = job_queue.enqueue_job(*work(), "amy")
+    assert job_queue.claim_job("a")[0] == job_id
+    # A live worker's job is left alone
+    assert job_queue.requeue_stale_jobs(lease=60, max_attempts=2) == 0
+    go_quiet(job_id)
+    assert job_queue.requeue_stale_jobs(lease=60, max_attempts=2) == 1
+    assert job_queue.claim_job("b")[0] == job_id
+    assert job_state(job_id) == (job_queue.RUNNING, 2)
+    go_quiet(job_id)
+    assert job_queue.requeue_stale_jobs(lease=60, max_attempts=2) == 0
+    assert job_state(job_id) == (job_queue.FAILED, 2)
+    assert job_queue.claim_job("a") is None
@@ -0,0 +1,31 @@
+import os
+
+from metrics import METRICS_DIR, MetricsRegistry, merge_metrics
+
+
+def test_metrics_live_in_the_configured_cache_dir():
+    assert METRICS_DIR == os.path.join(os.environ["STORAGE_CACHE_DIR"], "metrics")
+
+
+def test_processes_write_their_own_files_and_are_merged(tmp_path):
+    app = MetricsRegistry(directory=str(tmp_path), process="app")
+    worker = MetricsRegistry(directory=str(tmp_path), process="worker")
+    app.observe("extract", 0.01, cache="hit", size=10)
+    worker.observe("extract", 0.02, cache="miss", size=20)
+    app.flush()
+    worker.flush()
+    assert app.path != worker.path
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in (app.path, worker.path))
+
+    merged = merge_metrics(str(tmp_path)).splitlines()
+    # Each family's HELP and TYPE appear once, followed by the samples of both processes
+    assert merged.count("# TYPE skillshare_stage_seconds histogram") == 1
+    counts = [line for line in merged if line.startswith("skillshare_stage_seconds_count")]
+    assert len(counts) == 2
+    assert any(f'process="app-{os.getpid()}"' in line for line in counts)
+    assert any(f'process="worker-{os.getpid()}"' in line for line in counts)
+    type_line = merged.index("# TYPE skillshare_stage_input_bytes_total counter")
+    assert all(line.startswith("skillshare_stage_input_bytes_total") for line in merged[type_line + 1:])
+
+    app.remove()
+    assert os.listdir(tmp_path) == [os.path.basename(worker.path)]
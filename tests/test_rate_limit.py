@@ -0,0 +1,44 @@
+import time
+import uuid
+
+from rate_limit import AdmissionController, try_acquire
+
+
+def bucket():
+    """A bucket key no other test has used, so it starts full."""
+    return f"test:{uuid.uuid4().hex}"
+
+
+def test_bucket_runs_dry_then_reports_the_wait():
+    key = bucket()
+    assert try_acquire(key, capacity=2, refill_per_second=0.5) == (True, 0.0)
+    assert try_acquire(key, capacity=2, refill_per_second=0.5) == (True, 0.0)
+    acquired, retry_after = try_acquire(key, capacity=2, refill_per_second=0.5)
+    assert not acquired
+    assert 0 < retry_after <= 2
+
+
+def test_bucket_refills_over_time():
+    key = bucket()
+    assert try_acquire(key, capacity=1, refill_per_second=100)[0]
+    time.sleep(0.05)
+    assert try_acquire(key, capacity=1, refill_per_second=100)[0]
+
+
+def test_bucket_without_refill_never_reopens():
+    key = bucket()
+    assert try_acquire(key, capacity=1, refill_per_second=0)[0]
+    assert try_acquire(key, capacity=1, refill_per_second=0) == (False, float("inf"))
+
+
+def test_already_graded_work_is_admitted_without_a_token():
+    admission = AdmissionController(student_capacity=1, student_per_hour=1)
+    student = uuid.uuid4().hex
+    assert admission.admit(student, already_graded=False, queued=0)[0]
+    assert not admission.admit(student, already_graded=False, queued=0)[0]
+    assert admission.admit(student, already_graded=True, queued=0) == (True, 0.0)
+
+
+def test_a_full_queue_turns_work_away():
+    admission = AdmissionController(global_per_minute=60, max_queue=5)
+    assert admission.admit(uuid.uuid4().hex, already_graded=False, queued=7) == (False, 3.0)
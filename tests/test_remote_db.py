@@ -0,0 +1,62 @@
+import sqlite3
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from remote_db import RemoteConnection, RemoteDatabaseError, SessionStore, make_db_handler
+
+TOKEN = "test-secret"
+
+
+@pytest.fixture
+def server(tmp_path):
+    sessions = SessionStore(str(tmp_path / "remote.db"))
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_db_handler(sessions, TOKEN))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_transactions_round_trip(server):
+    conn = RemoteConnection(server, TOKEN)
+    try:
+        conn.execute('CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)')
+        with conn:
+            conn.execute('INSERT INTO rate_buckets VALUES (?, ?, ?)', ("global", 1.0, 0.0))
+            assert conn.in_transaction
+        assert not conn.in_transaction
+        with pytest.raises(RuntimeError):
+            with conn:
+                conn.execute('UPDATE rate_buckets SET tokens = 0')
+                raise RuntimeError("roll back")
+        assert conn.execute('SELECT key, tokens FROM rate_buckets').fetchall() == [("global", 1.0)]
+    finally:
+        conn.close()
+
+
+def test_requests_without_the_token_are_refused(server):
+    conn = RemoteConnection(server, "wrong")
+    with pytest.raises(RemoteDatabaseError, match="unauthorized"):
+        conn.execute('SELECT 1')
+
+
+@pytest.mark.parametrize("sql", [
+    "CREATE TABLE secrets (value TEXT)",
+    "ATTACH DATABASE '/tmp/other.db' AS other",
+    "DROP TABLE IF EXISTS submissions",
+    "PRAGMA journal_mode=DELETE",
+    "CREATE VIEW everything AS SELECT 1"
+])
+def test_statements_outside_the_app_schema_are_denied(server, sql):
+    conn = RemoteConnection(server, TOKEN)
+    try:
+        conn.execute('CREATE TABLE IF NOT EXISTS submissions (id INTEGER PRIMARY KEY)')
+        with pytest.raises(sqlite3.DatabaseError, match="not authorized"):
+            conn.execute(sql)
+        # The server connection survives a denied statement
+        assert conn.execute('SELECT 1').fetchone() == (1,)
+    finally:
+        conn.close()
@@ -1,25 +1,60 @@
 import os
-import PyPDF2
-import docx
-from datetime import datetime
-from openai import OpenAI  # ✅ required import
-
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
-from reportlab.lib.units import inch
-import streamlit as st
-import re
 import hashlib
 import json
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+# PyPDF2, python-docx and ReportLab (via report_utils) are imported on first use,
+# since most reruns of the app never extract a new file or render a report
+from prompt_utils import build_prompt, PROMPT_VERSION
+from notebook_utils import parse_notebook
+from feedback_utils import Feedback, parse_feedback, parse_feedback_json, parse_feedback_text, format_feedback
+from cache_utils import SQLiteCache, DirectoryCache, MemoryCache, TieredCache, SingleFlight, migrate_legacy_cache
+from similarity import SimilarityIndex
+from llm_backends import get_backend
+from metrics import span, registry as metrics_registry
+from config import get_setting
 
-client = OpenAI(api_key=st.secrets["openai"]["api_key"])
-
-CACHE_DIR = ".cache"
+CACHE_DIR = get_setting("storage", "cache_dir", ".cache")
+CACHE_PATH = os.path.join(CACHE_DIR, "evaluations.db")
+# A directory shared by every replica (e.g. an NFS mount); when set, evaluations are cached there
+# and in-flight locks are taken there, so replicas reuse each other's gradings
+SHARED_CACHE_DIR = get_setting("storage", "shared_cache_dir")
+CACHE_MAX_ENTRIES = 5000
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+CACHE_TTL = None  # seconds; None keeps entries until LRU eviction
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+if SHARED_CACHE_DIR:
+    evaluation_cache = DirectoryCache(
+        os.path.join(SHARED_CACHE_DIR, "evaluations"), CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_TTL
+    )
+else:
+    evaluation_cache = SQLiteCache(CACHE_PATH, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_TTL)
+# Identical submissions in flight at the same time share one model call
+evaluation_flights = SingleFlight(lock_dir=os.path.join(SHARED_CACHE_DIR or CACHE_DIR, "locks"))
+
+# PDF extraction limits: stop once this many characters are extracted (None for no limit),
+# and fan pages out across this many processes (None or 1 extracts in-process)
+MAX_EXTRACT_CHARS = 400_000
+PDF_EXTRACT_WORKERS = None
+
+# Extracted text keyed by the uploaded bytes; bump EXTRACTOR_VERSION when extraction output changes
+EXTRACTOR_VERSION = 2
+EXTRACTION_CACHE_PATH = os.path.join(CACHE_DIR, "extractions.db")
+extraction_cache = TieredCache(
+    MemoryCache(max_entries=64, max_bytes=32 * 1024 * 1024),
+    SQLiteCache(EXTRACTION_CACHE_PATH, max_entries=2000, max_bytes=200 * 1024 * 1024)
+)
+
+# Near-duplicate submissions to the same question: at or above SIMILARITY_FLAG_THRESHOLD, pairs from
+# different students are recorded for trainer review. Reusing another submission's grading is opt-in:
+# set similarity.reuse_threshold (e.g. 0.9) to reuse it at or above that score; None always calls the model
+_reuse_threshold = get_setting("similarity", "reuse_threshold")
+SIMILARITY_REUSE_THRESHOLD = float(_reuse_threshold) if _reuse_threshold else None
+SIMILARITY_FLAG_THRESHOLD = 0.8
+similarity_index = SimilarityIndex(os.path.join(CACHE_DIR, "similarity.db"))
+
 
 def normalize_text(text):
     if not text:
@@ -33,233 +68,305 @@ def get_cache_key(question, supporting_docs, final_output):
     key_str = json.dumps({"q": norm_q, "s": norm_s, "f": norm_f}, sort_keys=True)
     return hashlib.sha256(key_str.encode('utf-8')).hexdigest()
 
-def extract_text_from_file(file):
-    """Extract text from various file types."""
+def migrate_legacy_evaluations():
+    """Move evaluations cached as one JSON file each (before the SQLite cache) into evaluation_cache.
+
+    Run once at start-up by the app and the command-line tools, not on import.
+    """
+    return migrate_legacy_cache(evaluation_cache, CACHE_DIR)
+
+def get_evaluation_key(cache_key, backend):
+    """Evaluation cache key for backend's grading, under the current prompt, of the content behind cache_key.
+
+    Stub and stand-in gradings are keyed apart from real ones, so they are never served to students.
+    """
+    namespace = getattr(backend, "cache_namespace", None) or type(backend).__name__
+    key_str = json.dumps({"content": cache_key, "backend": namespace, "prompt": PROMPT_VERSION}, sort_keys=True)
+    return hashlib.sha256(key_str.encode('utf-8')).hexdigest()
+
+def get_cached_evaluation(cache_key, backend=None):
+    """Return backend's (by default the configured backend's) cached grading of cache_key's content, or None."""
+    backend = backend or get_backend()
+    evaluation_key = get_evaluation_key(cache_key, backend)
+    cached = evaluation_cache.get(evaluation_key)
+    if cached is None and getattr(backend, "cache_namespace", "").startswith("openai:"):
+        # Entries cached before keys named the backend were all OpenAI gradings, stored under the content key
+        cached = evaluation_cache.get(cache_key)
+        if cached is not None:
+            evaluation_cache.set(evaluation_key, cached)
+    return cached
+
+def get_question_key(question, supporting_docs):
+    key_str = json.dumps({"q": normalize_text(question), "s": normalize_text(supporting_docs)}, sort_keys=True)
+    return hashlib.sha256(key_str.encode('utf-8')).hexdigest()
+
+def iter_pdf_pages(file, max_chars=None, on_page=None):
+    """Yield (page_number, text, seconds) per page, stopping once max_chars have been extracted.
+
+    `on_page(page_number, page_count)` is called after each page is extracted.
+    """
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(file)
+    page_count = len(pdf_reader.pages)
+    extracted = 0
+    for page_number, page in enumerate(pdf_reader.pages, start=1):
+        started = time.perf_counter()
+        text = page.extract_text() or ""
+        if on_page:
+            on_page(page_number, page_count)
+        yield page_number, text, time.perf_counter() - started
+        extracted += len(text)
+        if max_chars is not None and extracted >= max_chars:
+            break
+
+def _extract_pdf_page_range(pdf_bytes, start, stop):
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    pages = []
+    for index in range(start, stop):
+        started = time.perf_counter()
+        text = pdf_reader.pages[index].extract_text() or ""
+        pages.append((index + 1, text, time.perf_counter() - started))
+    return pages
+
+def _iter_pdf_pages_parallel(file, max_chars, workers, on_page=None):
+    import PyPDF2
+
+    pdf_bytes = file.getvalue() if hasattr(file, 'getvalue') else file.read()
+    page_count = len(PyPDF2.PdfReader(io.BytesIO(pdf_bytes)).pages)
+    chunk_size = max(1, -(-page_count // workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_extract_pdf_page_range, pdf_bytes, start, min(start + chunk_size, page_count))
+            for start in range(0, page_count, chunk_size)
+        ]
+        extracted = 0
+        # Consume chunks in page order so the budget cuts off at the same place as the serial path
+        for future in futures:
+            for page in future.result():
+                if on_page:
+                    on_page(page[0], page_count)
+                yield page
+                extracted += len(page[1])
+                if max_chars is not None and extracted >= max_chars:
+                    for pending in futures:
+                        pending.cancel()
+                    return
+
+def extract_pdf_text(file, max_chars=None, workers=None, on_page=None):
+    """Extract PDF text, returning (text, [(page_number, seconds), ...]) for profiling."""
+    if workers and workers > 1:
+        pages = _iter_pdf_pages_parallel(file, max_chars, workers, on_page)
+    else:
+        pages = iter_pdf_pages(file, max_chars, on_page)
+    texts = []
+    timings = []
+    for page_number, text, seconds in pages:
+        texts.append(text)
+        timings.append((page_number, seconds))
+    text = "".join(texts)
+    if max_chars is not None:
+        text = text[:max_chars]
+    return text, timings
+
+def get_extraction_cache_key(file):
+    file_extension = file.name.split('.')[-1].lower()
+    digest = hashlib.sha256(f"{EXTRACTOR_VERSION}:{MAX_EXTRACT_CHARS}:{file_extension}:".encode('utf-8'))
+    digest.update(file.getvalue())
+    return digest.hexdigest()
+
+def extract_text_from_file(file, on_page=None):
+    """Extract text from various file types, reusing earlier results for identical uploads.
+
+    `on_page(page_number, page_count)` reports progress through PDFs that are not cached.
+    """
     if file is None:
         return ""
-    
+    with span("extract", size=file.size if hasattr(file, 'size') else len(file.getvalue())) as stage:
+        cache_key = get_extraction_cache_key(file)
+        text = extraction_cache.get(cache_key)
+        stage["cache"] = "hit" if text is not None else "miss"
+        if text is None:
+            text = _extract_text(file, on_page)
+            extraction_cache.set(cache_key, text)
+    return text
+
+def _extract_text(file, on_page=None):
     file_extension = file.name.split('.')[-1].lower()
     
     if file_extension == 'pdf':
-        pdf_reader = PyPDF2.PdfReader(file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
+        text, _ = extract_pdf_text(file, MAX_EXTRACT_CHARS, PDF_EXTRACT_WORKERS, on_page)
         return text
     
     elif file_extension in ['doc', 'docx']:
+        import docx
+
         doc = docx.Document(file)
         return "\n".join([paragraph.text for paragraph in doc.paragraphs])
     
-    elif file_extension == 'txt':
+    elif file_extension in ['txt', 'py']:
         return file.getvalue().decode('utf-8')
     
+    elif file_extension == 'ipynb':
+        try:
+            return parse_notebook(file.getvalue())["text"]
+        except ValueError:
+            # Malformed or truncated notebook: grade whatever source is in it
+            return file.getvalue().decode('utf-8', errors='replace')
+    
     return ""
 
-def analyze_submission(question, supporting_docs, final_output):
-    """Analyze submission using GPT-4.1-nano with caching for identical input."""
-    cache_key = get_cache_key(question, supporting_docs, final_output)
-    cache_path = os.path.join(CACHE_DIR, f"{cache_key}.json")
-    if os.path.exists(cache_path):
-        with open(cache_path, 'r', encoding='utf-8') as f:
-            cached = json.load(f)
-            return cached["result"]
-    prompt = f"""
-    You are Rohit Krishnan, a Business and Technology Strategist and an experienced Senior instructor at Boston Institute of Analytics. Analyze the following assignment submission with an encouraging and supporting tone and provide detailed feedback.
-
-    Question:
-    {question}
-    
-    Supporting Documents:
-    {supporting_docs}
-    
-    Final Output:
-    {final_output}
-    
-    Evaluate the submission based on these criteria (Total 10 marks):
-    1. Code Quality and Structure (5 marks) - Evaluate code organization, logic, efficiency, and structure
-    2. Problem-Solving Approach (2 marks) - Assess how well the problem was understood and solved
-    3. Documentation and Comments (2 marks) - Check for clear comments, documentation, and readability
-    4. Best Practices (1 mark) - Evaluate adherence to coding standards and best practices
+def analyze_submission(question, supporting_docs, final_output, llm_client=None, timeout=None):
+    """Analyze submission with the configured model backend, caching identical input.
 
-    Provide feedback in this EXACT format:
+    `llm_client` overrides the backend with any object from llm_backends (or with a `complete` method).
+    """
+    return evaluate_submission(question, supporting_docs, final_output, llm_client, timeout)[0]
+
+def evaluate_submission(question, supporting_docs, final_output, llm_client=None, timeout=None, student_name=None,
+                        on_progress=None):
+    """Evaluate a submission and return (feedback text, parsed Feedback), caching both.
+
+    `on_progress(stage, text=None)` is called as the evaluation moves through the "similarity",
+    "prompt", "model" and "parse" stages; during "model" `text` is the reply received so far.
+    """
+    on_progress = on_progress or _ignore_progress
+    backend = llm_client or get_backend()
+    size = len(question or "") + len(supporting_docs or "") + len(final_output or "")
+    with span("evaluate", size=size) as stage:
+        cache_key = get_cache_key(question, supporting_docs, final_output)
+        evaluation_key = get_evaluation_key(cache_key, backend)
+        cached = get_cached_evaluation(cache_key, backend)
+        if cached is not None:
+            stage["cache"] = "hit"
+            if student_name:
+                similarity_index.record_duplicate(cache_key, student_name)
+            return _cached_evaluation(evaluation_key, cached)
+        stage["cache"] = "miss"
+        return evaluation_flights.do(
+            evaluation_key,
+            lambda: _evaluate_submission(
+                cache_key, question, supporting_docs, final_output, backend, timeout, student_name, on_progress
+            )
+        )
+
+def _ignore_progress(stage, text=None):
+    pass
+
+def _cached_evaluation(evaluation_key, cached):
+    if "feedback" in cached:
+        return cached["result"], Feedback.from_dict(cached["feedback"])
+    # Entries cached before structured feedback existed are parsed once and stored back
+    feedback = parse_feedback(cached["result"])
+    evaluation_cache.set(evaluation_key, {**cached, "feedback": feedback.to_dict()})
+    return cached["result"], feedback
 
-    STRENGTHS:
-    [Write a short paragraph summarizing the main strengths.]
+def _reuse_similar_evaluation(evaluation_key, backend, matches):
+    """Return backend's cached grading of the most similar match above the reuse threshold, if any."""
+    if SIMILARITY_REUSE_THRESHOLD is None:
+        return None
+    for match_key, _, score in matches:
+        if score < SIMILARITY_REUSE_THRESHOLD:
+            break
+        cached = get_cached_evaluation(match_key, backend)
+        if cached is not None:
+            evaluation_cache.set(evaluation_key, {**cached, "reused_from": match_key, "similarity": score})
+            return cached
+    return None
 
-    AREAS FOR IMPROVEMENT:
-    [Write a short paragraph summarizing the main areas for improvement.]
+def _evaluate_submission(cache_key, question, supporting_docs, final_output, backend, timeout, student_name=None,
+                         on_progress=_ignore_progress):
+    evaluation_key = get_evaluation_key(cache_key, backend)
+    # Another process may have finished this evaluation while we waited on the lock
+    cached = evaluation_cache.get(evaluation_key)
+    if cached is not None:
+        return _cached_evaluation(evaluation_key, cached)
+    on_progress("similarity")
+    with span("similarity") as stage:
+        question_key = get_question_key(question, supporting_docs)
+        signature = similarity_index.signature(normalize_text(final_output))
+        matches = similarity_index.find_similar(question_key, signature, SIMILARITY_FLAG_THRESHOLD)
+        similarity_index.flag(cache_key, student_name, matches)
+        similarity_index.add(question_key, cache_key, student_name, signature)
+        cached = _reuse_similar_evaluation(evaluation_key, backend, matches)
+        stage["cache"] = "hit" if cached is not None else "miss"
+    if cached is not None:
+        return _cached_evaluation(evaluation_key, cached)
+    on_progress("prompt")
+    with span("prompt_build"):
+        prompt, prompt_tokens = build_prompt(question, supporting_docs, final_output)
+    on_progress("model", "")
+    with span("model_call", size=len(prompt)):
+        content = _complete(backend, prompt, timeout, on_progress)
+    on_progress("parse")
+    with span("parse_feedback", size=len(content)):
+        feedback = parse_feedback_json(content)
+        if feedback is None:
+            # The model ignored the JSON format; fall back to the plain-text layout
+            feedback = parse_feedback_text(content)
+            result = content
+        else:
+            result = format_feedback(feedback)
+    evaluation_cache.set(evaluation_key, {"result": result, "feedback": feedback.to_dict(), "prompt_tokens": prompt_tokens})
+    return result, feedback
 
-    SCORE BREAKDOWN:
-    Code Quality: [score]/5 – [brief explanation]
-    Problem-Solving: [score]/2 – [brief explanation]
-    Documentation: [score]/2 – [brief explanation]
-    Best Practices: [score]/1 – [brief explanation]
+# Streamed replies are passed to on_progress at most this often
+STREAM_PROGRESS_INTERVAL = 0.1
 
-    TOTAL SCORE: [total score]/10
+def _complete(backend, prompt, timeout, on_progress):
+    """Stream the reply through on_progress when the backend supports it."""
+    if not hasattr(backend, "stream"):
+        return backend.complete(prompt, timeout=timeout)
+    started = time.perf_counter()
+    chunks = []
+    reported = 0.0
+    for chunk in backend.stream(prompt, timeout=timeout):
+        if not chunks:
+            metrics_registry.observe("model_first_token", time.perf_counter() - started)
+        chunks.append(chunk)
+        # Joining the reply so far is linear in its length, so only do it when a progress update is due
+        now = time.perf_counter()
+        if now - reported >= STREAM_PROGRESS_INTERVAL:
+            reported = now
+            on_progress("model", "".join(chunks))
+    return "".join(chunks)
 
-    FINAL VERDICT:
-    [Write a short paragraph with the final verdict and encouragement.]
+# ReportLab is not reliably thread-safe, so background rendering uses a single worker
+report_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report")
 
-    IMPORTANT: Be consistent and objective in your scoring. Use the same criteria for similar submissions. Score must be a whole number or decimal (e.g., 7.5, 8.0).
+def render_pdf_report(student_name, institution, question_summary, feedback, score):
+    """Render the PDF report in memory and return its bytes.
+
+    `feedback` may be a parsed Feedback or the raw feedback text.
     """
-    response = client.chat.completions.create(
-    model="gpt-4.1-nano",
-    messages=[{"role": "user", "content": prompt}],
-    temperature=0.0
-    )
-    result = response.choices[0].message.content
-    with open(cache_path, 'w', encoding='utf-8') as f:
-        json.dump({"result": result}, f)
-    return result
-
-def clean_bullets(text):
-    # Remove markdown and extra symbols, split on dash, and clean
-    items = [re.sub(r'[\-*•]+', '', s).replace('**', '').strip() for s in text.split(' - ') if s.strip()]
-    return [item for item in items if item]
-
-def clean_markdown(text):
-    # Remove markdown symbols and extra whitespace
-    return re.sub(r'[\-*•]+', '', text).replace('**', '').replace('###', '').strip()
-
-def extract_score_details(score_breakdown_text):
-    # Split on newlines for each criterion
-    rows = []
-    from reportlab.platypus import Paragraph
-    from reportlab.lib.styles import getSampleStyleSheet
-    styles = getSampleStyleSheet()
-    for line in score_breakdown_text.splitlines():
-        line = line.replace('**', '').strip()
-        if line and ':' in line and not line.startswith('-') and not line.startswith('*'):
-            parts = line.split(':', 1)
-            crit = parts[0].strip()
-            rest = parts[1].strip()
-            # Split score and explanation if possible
-            match = re.match(r'([0-9]+(?:\.[0-9]+)?\s*/\s*[0-9]+)\s*[–-]?\s*(.*)', rest)
-            if match:
-                score = match.group(1).replace(' ', '')
-                explanation = match.group(2).strip()
-            else:
-                score = rest.split()[0] if rest.split() else rest
-                explanation = ' '.join(rest.split()[1:]) if len(rest.split()) > 1 else ''
-            # Use Paragraph for explanation to allow wrapping
-            rows.append([crit, Paragraph(f"{score} – {explanation}", styles['BodyText']) if explanation else score])
-    return rows
-
-def parse_assignment_summary(summary):
-    # Try to extract known fields and return as (label, value) pairs
-    fields = [
-        ("Assignment Title", r"Assignment\s*:?\s*([^■\n]+)", None),
-        ("Institution", r"Institution\s*:?\s*([^■\n]+)", None),
-        ("Trainer", r"Trainer\s*:?\s*([^■\n]+)", None),
-        ("Due Date", r"Due Date\s*:?\s*([^■\n]+)", None),
-        ("Submission Format", r"Submission Format\s*:?\s*([^■\n]+)", None),
-    ]
-    results = []
-    for label, pattern, _ in fields:
-        match = re.search(pattern, summary, re.IGNORECASE)
-        if match:
-            results.append((label, match.group(1).strip()))
-    return results
+    with span("render_report") as stage:
+        from report_utils import build_pdf_report
+        pdf_bytes = build_pdf_report(student_name, institution, question_summary, feedback, score)
+        stage["size"] = len(pdf_bytes)
+    return pdf_bytes
 
 def generate_pdf_report(student_name, institution, question_summary, feedback, score, output_path):
     """Generate PDF report."""
-    doc = SimpleDocTemplate(output_path, pagesize=letter)
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=20,
-        alignment=TA_CENTER
-    )
-    story.append(Paragraph("SkillShareVerify™ Report", title_style))
-
-    # Header with timestamp
-    story.append(Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
-    story.append(Spacer(1, 20))
-
-    # Student Information
-    story.append(Paragraph("<b>Student Information</b>", styles['Heading2']))
-    story.append(Paragraph(f"<b>Name:</b> {student_name}", styles['Normal']))
-    story.append(Paragraph(f"<b>Institution:</b> {institution}", styles['Normal']))
-    story.append(Spacer(1, 10))
-
-    # Trainer Information
-    story.append(Paragraph("<b>Trainer Information</b>", styles['Heading2']))
-    story.append(Paragraph("<b>Name:</b> Rohit Krishnan", styles['Normal']))
-    story.append(Paragraph("<b>Role:</b> Senior Trainer of Data Science & AI", styles['Normal']))
-    story.append(Spacer(1, 20))
-
-    # Feedback (structured)
-    story.append(Paragraph("<b>Feedback</b>", styles['Heading2']))
-    strengths = re.findall(r"STRENGTHS:(.*?)(AREAS FOR IMPROVEMENT:|SCORE BREAKDOWN:|TOTAL SCORE:|FINAL VERDICT:)", feedback, re.DOTALL)
-    improvements = re.findall(r"AREAS FOR IMPROVEMENT:(.*?)(SCORE BREAKDOWN:|TOTAL SCORE:|FINAL VERDICT:)", feedback, re.DOTALL)
-    score_breakdown = re.findall(r"SCORE BREAKDOWN:(.*?)(TOTAL SCORE:|FINAL VERDICT:)", feedback, re.DOTALL)
-    total_score = re.findall(r"TOTAL SCORE:(.*?)(FINAL VERDICT:)", feedback, re.DOTALL)
-    final_verdict = re.findall(r"FINAL VERDICT:(.*)", feedback, re.DOTALL)
-
-    # Strengths as paragraph
-    if strengths:
-        strengths_text = clean_markdown(strengths[0][0]).replace(' .', '.').replace('..', '.').strip()
-        if strengths_text:
-            story.append(Paragraph(f"<b>Strengths:</b> {strengths_text}", styles['BodyText']))
-            story.append(Spacer(1, 6))
-    # Areas for Improvement as paragraph
-    if improvements:
-        improvements_text = clean_markdown(improvements[0][0]).replace(' .', '.').replace('..', '.').strip()
-        if improvements_text:
-            story.append(Paragraph(f"<b>Areas for Improvement:</b> {improvements_text}", styles['BodyText']))
-            story.append(Spacer(1, 6))
-    # Score Breakdown Table with details
-    if score_breakdown:
-        story.append(Paragraph("<b>Score Breakdown:</b>", styles['BodyText']))
-        table_data = [["Criteria", "Score & Explanation"]]
-        table_data += extract_score_details(score_breakdown[0][0])
-        col_widths = [2.5*inch, 3.5*inch]
-        table = Table(table_data, colWidths=col_widths, hAlign='LEFT')
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.black),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 6),
-            ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ]))
-        story.append(table)
-        story.append(Spacer(1, 6))
-    # Total Score
-    if total_score:
-        story.append(Paragraph(f"<b>Total Score:</b> {clean_markdown(total_score[0][0].strip())}", styles['BodyText']))
-        story.append(Spacer(1, 6))
-    # Final Verdict as paragraph
-    if final_verdict:
-        verdict_text = clean_markdown(final_verdict[0]).replace(' .', '.').replace('..', '.').strip()
-        if verdict_text:
-            story.append(Spacer(1, 10))
-            story.append(Paragraph(f"<b>Final Verdict:</b> {verdict_text}", styles['BodyText']))
-            story.append(Spacer(1, 10))
-
-    # Score
-    story.append(Paragraph("<b>Score</b>", styles['Heading2']))
-    story.append(Paragraph(f"Score: {score}/10", styles['Normal']))
-
-    # Footer with contact details
-    story.append(Spacer(1, 50))
-    story.append(Paragraph("Generated via SkillShareVerify™", styles['Normal']))
-    story.append(Paragraph("Created by Rohit Krishnan", styles['Normal']))
-    story.append(Paragraph("Contact Information:", styles['Normal']))
-    story.append(Paragraph("📧 Email: rohitkrishnanm@gmail.com", styles['Normal']))
-    story.append(Paragraph("🌐 Website: https://rohitkrishnan.co.in", styles['Normal']))
-    story.append(Paragraph("🔗 LinkedIn: https://www.linkedin.com/in/rohit-krishnan-m", styles['Normal']))
-    story.append(Paragraph("📸 Instagram: https://www.instagram.com/prof_rohit_/", styles['Normal']))
-
-    doc.build(story)
+    pdf_bytes = render_pdf_report(student_name, institution, question_summary, feedback, score)
+    with open(output_path, 'wb') as f:
+        f.write(pdf_bytes)
+
+def submit_pdf_report(student_name, institution, question_summary, feedback, score):
+    """Render the report on the background report worker. Returns a Future of the PDF bytes."""
+    return report_executor.submit(render_pdf_report, student_name, institution, question_summary, feedback, score)
+
+def render_pdf_reports(reports, workers=None):
+    """Render many (student_name, institution, question_summary, feedback, score) reports in a process pool."""
+    if not reports:
+        return []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_pdf_report, *zip(*reports)))
+
+def extract_score(analysis):
+    """Extract the total score out of 10 from the feedback, defaulting to 0."""
+    return parse_feedback(analysis).score
 
 def get_evaluation_result(score):
     """Get evaluation result based on score."""